@@ -4,12 +4,13 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import re
 from collections import Counter, defaultdict
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 import yaml
 
@@ -135,22 +136,59 @@ ALLOWED_COMMANDS: Set[str] = {
     "arabic",
 }
 
-MACRO_DEF_PATTERNS = [
-    re.compile(r"\\newcommand\{\\([A-Za-z]+)\}"),
-    re.compile(r"\\DeclareMathOperator\{\\([A-Za-z]+)\}"),
-    re.compile(r"\\def\\([A-Za-z]+)\b"),
-]
-
-COMMAND_USE_RE = re.compile(r"\\([A-Za-z]+)")
-INLINE_MATH_RE = re.compile(r"\$(.+?)\$", re.DOTALL)
-DISPLAY_MATH_RE = re.compile(r"\\\[(.+?)\\\]", re.DOTALL)
-PAREN_MATH_RE = re.compile(r"\\\((.+?)\\\)", re.DOTALL)
-ENV_MATH_RE = re.compile(
-    r"\\begin\{(align\*?|equation\*?|multline\*?|gather\*?|split)\}(.+?)\\end\{\1\}",
+MATH_ENVIRONMENTS = {
+    "align",
+    "align*",
+    "equation",
+    "equation*",
+    "multline",
+    "multline*",
+    "gather",
+    "gather*",
+    "split",
+}
+DEFINING_COMMANDS = {"newcommand", "DeclareMathOperator"}
+DEFINERS = DEFINING_COMMANDS | {"def"}
+MATH_ARGUMENT_SKIPS = {"label", "eqref"}
+
+# One alternation covering every lexical unit of math mode; the scanner advances with
+# .match(text, pos), so each character is visited once. Letters, spaces and other inert
+# characters form one `run` token whose only effect is the base it leaves behind; `}` stays a
+# token of its own so a pending superscript base is restored exactly after its group.
+TOKEN_RE = re.compile(
+    r"(?P<comment>%[^\n]*)"
+    r"|(?P<word>\\[A-Za-z]+)"
+    r"|(?P<symbol>\\[^A-Za-z]?)"
+    r"|(?P<ddollar>\$\$)"
+    r"|(?P<dollar>\$)"
+    r"|(?P<sup>\^)"
+    r"|(?P<sub>_)"
+    r"|(?P<run>[^\\$%^_}]+)"
+    r"|(?P<other>.)",
+    re.DOTALL,
+)
+# Trailing letters of a run (after stripping spaces): the base for a following ^ or _.
+RUN_BASE_RE = re.compile(r"[A-Za-z]+\Z")
+# Outside math only control sequences, dollars and comments matter. TEXT_SPAN_RE consumes a
+# whole stretch of text-mode tokens in C and stops at the next math opener ($, \[, \( or
+# \begin{<math env>}); TEXT_WORD_RE then lists its control words with the same tokenization.
+_MATH_ENV_ALT = "|".join(re.escape(env) for env in sorted(MATH_ENVIRONMENTS, key=len, reverse=True))
+TEXT_SPAN_RE = re.compile(
+    r"(?:[^\\$%]+"
+    r"|%[^\n]*"
+    r"|\\(?!begin\{(?:" + _MATH_ENV_ALT + r")\})[A-Za-z]+"
+    r"|\\[^A-Za-z\[(]"
+    r"|\\\Z)*",
     re.DOTALL,
 )
-INDEXED_RE = re.compile(r"(\\?[A-Za-z]+)\s*(?:\^\{[^{}]*\}|\^[A-Za-z0-9])?\s*_\{([^{}]+)\}")
-INDEXED_SIMPLE_RE = re.compile(r"(\\?[A-Za-z]+)\s*(?:\^\{[^{}]*\}|\^[A-Za-z0-9])?\s*_([A-Za-z0-9])")
+TEXT_WORD_RE = re.compile(r"%[^\n]*|\\([A-Za-z]+)|\\[^A-Za-z]?", re.DOTALL)
+ENV_NAME_RE = re.compile(r"\{([A-Za-z]+\*?)\}")
+DEF_BRACED_RE = re.compile(r"\{\\([A-Za-z]+)\}")
+DEF_PLAIN_RE = re.compile(r"\\([A-Za-z]+)\b")
+BRACED_ARG_RE = re.compile(r"\{[^}]+\}")
+SUP_GROUP_RE = re.compile(r"\{[^{}]*\}")
+SUB_GROUP_RE = re.compile(r"\{([^{}]+)\}")
+SCRIPT_CHAR_RE = re.compile(r"[A-Za-z0-9]")
 
 STYLE_MACROS = {"bm", "tilde", "hat", "bar", "mathcal", "mathbb", "mathrm"}
 INDEX_BASE_IGNORES = {
@@ -202,6 +240,77 @@ class Finding:
     location: str
 
 
+@dataclass
+class TexScan:
+    """Output of one linear pass over a LaTeX source; all positions are 1-based lines.
+
+    Control words are kept as use counts plus the line of each name's first use (anywhere
+    and inside math), which is all the checks need.
+    """
+
+    used_macros: Counter = field(default_factory=Counter)
+    macro_lines: Dict[str, int] = field(default_factory=dict)
+    math_macro_lines: Dict[str, int] = field(default_factory=dict)
+    definitions: List[Tuple[str, int]] = field(default_factory=list)
+    math_spans: List[Tuple[int, int, int]] = field(default_factory=list)  # (start, end, line)
+    indexed: List[Tuple[str, Tuple[str, ...], int]] = field(default_factory=list)
+
+
+@dataclass
+class FileExtraction:
+    """Per-file extraction results; cross-file checks only ever see merged extractions."""
+
+    digest: str
+    defined_macros: Set[str] = field(default_factory=set)
+    used_macros: Counter = field(default_factory=Counter)
+    macro_lines: Dict[str, int] = field(default_factory=dict)
+    index_usage: Dict[str, Set[Tuple[str, ...]]] = field(default_factory=dict)
+    index_lines: Dict[str, Dict[int, int]] = field(default_factory=dict)
+    sigma_line: Optional[int] = None
+    tau_line: Optional[int] = None
+
+    def to_json(self) -> dict:
+        return {
+            "digest": self.digest,
+            "defined_macros": sorted(self.defined_macros),
+            "used_macros": dict(self.used_macros),
+            "macro_lines": self.macro_lines,
+            "index_usage": {k: sorted(list(v) for v in vals) for k, vals in self.index_usage.items()},
+            "index_lines": {k: {str(a): line for a, line in v.items()} for k, v in self.index_lines.items()},
+            "sigma_line": self.sigma_line,
+            "tau_line": self.tau_line,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "FileExtraction":
+        return cls(
+            digest=str(data["digest"]),
+            defined_macros=set(data["defined_macros"]),
+            used_macros=Counter(data["used_macros"]),
+            macro_lines=dict(data["macro_lines"]),
+            index_usage={k: {tuple(v) for v in vals} for k, vals in data["index_usage"].items()},
+            index_lines={k: {int(a): line for a, line in v.items()} for k, v in data["index_lines"].items()},
+            sigma_line=data["sigma_line"],
+            tau_line=data["tau_line"],
+        )
+
+
+@dataclass
+class MergedExtraction:
+    """Union of per-file extractions with first-occurrence locations as `path:line`."""
+
+    defined_macros: Set[str]
+    used_macros: Counter
+    macro_locations: Dict[str, str]
+    index_usage: Dict[str, Set[Tuple[str, ...]]]
+    index_locations: Dict[str, Dict[int, str]]
+    sigma_location: Optional[str]
+    tau_location: Optional[str]
+
+
+CACHE_VERSION = 3
+
+
 @dataclass
 class NotationSummary:
     tex_files: int
@@ -213,44 +322,201 @@ class NotationSummary:
     findings: List[Finding]
 
 
-def strip_comments(text: str) -> str:
-    # Remove unescaped comments.
-    return re.sub(r"(?<!\\)%.*", "", text)
-
-
-def read_tex_files(tex_root: Path) -> Dict[str, str]:
-    files: Dict[str, str] = {}
-    for path in sorted(tex_root.rglob("*.tex")):
-        rel = str(path)
-        files[rel] = strip_comments(path.read_text(encoding="utf-8"))
-    return files
-
+def content_digest(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
 
-def extract_defined_macros(text: str) -> Set[str]:
-    out: Set[str] = set()
-    for pattern in MACRO_DEF_PATTERNS:
-        out.update(pattern.findall(text))
-    return out
 
+def extractor_fingerprint() -> str:
+    """Digest of this module's source and the sets the extractor reads at run time.
 
-def extract_used_macros(text: str) -> Counter:
-    return Counter(COMMAND_USE_RE.findall(text))
-
-
-def extract_math_chunks(text: str) -> List[str]:
-    chunks: List[str] = []
-    chunks.extend(INLINE_MATH_RE.findall(text))
-    chunks.extend(DISPLAY_MATH_RE.findall(text))
-    chunks.extend(PAREN_MATH_RE.findall(text))
-    for _env, body in ENV_MATH_RE.findall(text):
-        chunks.append(body)
-
-    cleaned: List[str] = []
-    for chunk in chunks:
-        tmp = re.sub(r"\\label\{[^}]+\}", " ", chunk)
-        tmp = re.sub(r"\\eqref\{[^}]+\}", " ", tmp)
-        cleaned.append(tmp)
-    return cleaned
+    Stored in the cache header; a cache written by different extractor code or configuration
+    (e.g. another INDEX_BASE_IGNORES) is discarded instead of serving stale results.
+    """
+    config = {
+        "version": CACHE_VERSION,
+        "math_environments": sorted(MATH_ENVIRONMENTS),
+        "definers": sorted(DEFINERS),
+        "math_argument_skips": sorted(MATH_ARGUMENT_SKIPS),
+        "index_base_ignores": sorted(INDEX_BASE_IGNORES),
+    }
+    return content_digest(json.dumps(config, sort_keys=True).encode("utf-8") + Path(__file__).read_bytes())
+
+
+def defined_name(command: str, text: str, pos: int) -> Optional[str]:
+    """Macro defined by `command` (\\newcommand{\\x}, \\DeclareMathOperator{\\x} or \\def\\x) at `pos`."""
+    d = (DEF_PLAIN_RE if command == "def" else DEF_BRACED_RE).match(text, pos)
+    return d.group(1) if d else None
+
+
+def scan_tex(text: str) -> TexScan:
+    """Tokenize LaTeX in a single left-to-right pass.
+
+    Emits control-word counts with first lines (overall and inside math), macro definitions, math
+    spans ($..$, $$..$$, \\[..\\], \\(..\\) and display environments) and indexed bases
+    `base^{sup}_{idx}` inside math, all tagged with source lines. Comments are skipped.
+
+    Text mode is handled a stretch at a time by regexes; only math walks TOKEN_RE unit by
+    unit. Positions are kept as offsets and mapped to lines once, at the end; a text stretch
+    is walked token by token only when it holds a definition or a not-yet-seen macro name.
+    """
+    used: Counter = Counter()
+    first: Dict[str, int] = {}
+    math_first: Dict[str, int] = {}
+    definitions: List[Tuple[str, int]] = []
+    spans: List[Tuple[int, int]] = []
+    indexed: List[Tuple[str, Tuple[str, ...], int]] = []
+    pos = 0
+    n_chars = len(text)
+    inline = display = False
+    env_depth = 0
+    base: Optional[str] = None
+    sup_done = False
+    # (end position, base) of a pending superscript group; the base is restored after it.
+    restore: Optional[Tuple[int, Optional[str]]] = None
+
+    while pos < n_chars:
+        # Text mode: one regex match to the next math opener, bulk word collection for the stretch.
+        stop = TEXT_SPAN_RE.match(text, pos).end()
+        names = [name for name in TEXT_WORD_RE.findall(text, pos, stop) if name]
+        if names:
+            used.update(names)
+            if not first.keys() >= set(names) or not DEFINERS.isdisjoint(names):
+                for w in TEXT_WORD_RE.finditer(text, pos, stop):
+                    name = w.group(1)
+                    if name:
+                        first.setdefault(name, w.start())
+                        if name in DEFINERS:
+                            d = defined_name(name, text, w.end())
+                            if d:
+                                definitions.append((d, w.start()))
+        if stop >= n_chars:
+            break
+        # The opener itself: $, $$, \[, \( or \begin{env} (recorded as a text-mode word).
+        m = TOKEN_RE.match(text, stop)
+        kind = m.lastgroup
+        pos = m.end()
+        if kind == "word":
+            used["begin"] += 1
+            first.setdefault("begin", stop)
+            env_depth = 1
+            pos = ENV_NAME_RE.match(text, pos).end()
+        elif kind == "ddollar":
+            display = True
+        elif kind == "dollar":
+            inline = True
+        elif m.group() == "\\[":
+            display = True
+        else:
+            inline = True
+        # Every way into math clears the base; a pending superscript may end inside this span.
+        if restore is not None and stop >= restore[0]:
+            restore = None
+        base = None
+
+        # Math mode: one TOKEN_RE unit per iteration until every delimiter is closed.
+        while pos < n_chars:
+            if restore is not None and pos >= restore[0]:
+                base, sup_done, restore = restore[1], True, None
+            m = TOKEN_RE.match(text, pos)
+            kind = m.lastgroup
+            pos = m.end()
+
+            # Most frequent first; only delimiters and math environments can close the span.
+            if kind == "run":
+                run = m.group().rstrip()
+                if run:
+                    letters = RUN_BASE_RE.search(run)
+                    base, sup_done = (letters.group(), False) if letters else (None, sup_done)
+                continue
+            if kind == "other":
+                base = None
+                continue
+            if kind == "comment":
+                continue
+            if kind == "word":
+                name = m.group()[1:]
+                used[name] += 1
+                first.setdefault(name, m.start())
+                math_first.setdefault(name, m.start())
+                if name in DEFINERS:
+                    d = defined_name(name, text, pos)
+                    if d:
+                        definitions.append((d, m.start()))
+                elif name in MATH_ARGUMENT_SKIPS:
+                    arg = BRACED_ARG_RE.match(text, pos)
+                    if arg:
+                        pos = arg.end()
+                base, sup_done = name, False
+                if name != "begin" and name != "end":
+                    continue
+                env = ENV_NAME_RE.match(text, pos)
+                if not env or env.group(1) not in MATH_ENVIRONMENTS:
+                    continue
+                env_depth = env_depth + 1 if name == "begin" else max(0, env_depth - 1)
+                pos = env.end()
+            elif kind == "sub":
+                group = SUB_GROUP_RE.match(text, pos)
+                char = None if group else SCRIPT_CHAR_RE.match(text, pos)
+                if base is not None and base not in INDEX_BASE_IGNORES:
+                    if group:
+                        indexed.append((base, index_parts(group.group(1)), m.start()))
+                    elif char:
+                        indexed.append((base, (char.group(),), m.start()))
+                if char:
+                    pos = char.end()
+                base = None
+                continue
+            elif kind == "sup":
+                group = SUP_GROUP_RE.match(text, pos)
+                if base is not None and not sup_done and group:
+                    restore = (group.end(), base)
+                    base = None
+                elif base is not None and not sup_done and SCRIPT_CHAR_RE.match(text, pos):
+                    pos += 1
+                    sup_done = True
+                else:
+                    base = None
+                continue
+            else:
+                tok = m.group()
+                if kind == "symbol":
+                    if tok == "\\[" or tok == "\\]":
+                        display = tok == "\\["
+                    elif tok == "\\(" or tok == "\\)":
+                        inline = tok == "\\("
+                elif kind == "ddollar":
+                    display = not display
+                elif kind == "dollar":
+                    inline = not inline
+                base = None
+            if not (inline or display or env_depth > 0):
+                spans.append((stop, pos))
+                break
+
+    # Lines only for recorded offsets: count newlines between consecutive sorted offsets.
+    offsets = sorted(
+        set(first.values())
+        | set(math_first.values())
+        | {at for _name, at in definitions}
+        | {start for start, _end in spans}
+        | {at for _name, _parts, at in indexed}
+    )
+    lines: Dict[int, int] = {}
+    prev, count = 0, 1
+    for at in offsets:
+        count += text.count("\n", prev, at)
+        lines[at] = count
+        prev = at
+    line = lines.__getitem__
+
+    return TexScan(
+        used_macros=used,
+        macro_lines={name: line(at) for name, at in first.items()},
+        math_macro_lines={name: line(at) for name, at in math_first.items()},
+        definitions=[(name, line(at)) for name, at in definitions],
+        math_spans=[(start, end, line(start)) for start, end in spans],
+        indexed=[(name, parts, line(at)) for name, parts, at in indexed],
+    )
 
 
 def parse_registry(path: Path) -> Tuple[List[dict], Dict[str, List[dict]]]:
@@ -289,20 +555,105 @@ def index_parts(raw_index: str) -> Tuple[str, ...]:
     return tuple(parts) if parts else (raw_index.strip(),)
 
 
-def extract_index_usage(math_chunks: Iterable[str]) -> Dict[str, Set[Tuple[str, ...]]]:
+def extract_file(text: str, digest: str) -> FileExtraction:
+    scan = scan_tex(text)
+    ext = FileExtraction(digest=digest)
+    ext.defined_macros = {name for name, _line in scan.definitions}
+    ext.used_macros = scan.used_macros
+    ext.macro_lines = scan.macro_lines
+    ext.sigma_line = scan.math_macro_lines.get("sigma")
+    ext.tau_line = scan.math_macro_lines.get("tau")
     usage: Dict[str, Set[Tuple[str, ...]]] = defaultdict(set)
-    for chunk in math_chunks:
-        for base, idx in INDEXED_RE.findall(chunk):
-            canon = canonical_base(base)
-            if canon in INDEX_BASE_IGNORES:
-                continue
-            usage[canon].add(index_parts(idx))
-        for base, idx in INDEXED_SIMPLE_RE.findall(chunk):
-            canon = canonical_base(base)
-            if canon in INDEX_BASE_IGNORES:
-                continue
-            usage[canon].add((idx,))
-    return usage
+    for base, parts, line in scan.indexed:
+        usage[base].add(parts)
+        ext.index_lines.setdefault(base, {}).setdefault(len(parts), line)
+    ext.index_usage = dict(usage)
+    return ext
+
+
+def load_extraction_cache(cache_path: Optional[Path], fingerprint: str) -> Dict[str, FileExtraction]:
+    """Cached extractions keyed by path relative to the tex root; empty on any version or fingerprint mismatch."""
+    if cache_path is None or not cache_path.exists():
+        return {}
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != CACHE_VERSION or data.get("extractor") != fingerprint:
+        return {}
+    return {path: FileExtraction.from_json(entry) for path, entry in data.get("files", {}).items()}
+
+
+def write_extraction_cache(cache_path: Path, extractions: Dict[str, FileExtraction], fingerprint: str) -> None:
+    payload = {
+        "version": CACHE_VERSION,
+        "extractor": fingerprint,
+        "files": {path: ext.to_json() for path, ext in sorted(extractions.items())},
+    }
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(cache_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(payload, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(cache_path)
+
+
+def extract_tex_tree(
+    tex_root: Path,
+    cache_path: Optional[Path] = None,
+    patterns: Tuple[str, ...] = ("*.tex",),
+) -> Tuple[Dict[str, FileExtraction], int]:
+    """Extract every file matching `patterns` under `tex_root`, reusing cached results for unchanged content.
+
+    Cache entries are keyed by the path relative to `tex_root`, so a moved checkout keeps its
+    cache; the returned extractions are keyed by the path as found, which appears in locations.
+    Returns the per-file extractions and the number of files that had to be reprocessed.
+    """
+    fingerprint = extractor_fingerprint()
+    cached = load_extraction_cache(cache_path, fingerprint)
+    extractions: Dict[str, FileExtraction] = {}
+    by_rel: Dict[str, FileExtraction] = {}
+    reprocessed = 0
+    paths = sorted({path for pattern in patterns for path in tex_root.rglob(pattern)})
+    for path in paths:
+        rel = path.relative_to(tex_root).as_posix()
+        raw = path.read_bytes()
+        digest = content_digest(raw)
+        hit = cached.get(rel)
+        if hit is None or hit.digest != digest:
+            hit = extract_file(raw.decode("utf-8"), digest)
+            reprocessed += 1
+        extractions[str(path)] = by_rel[rel] = hit
+    if cache_path is not None and (reprocessed or set(cached) != set(by_rel)):
+        write_extraction_cache(cache_path, by_rel, fingerprint)
+    return extractions, reprocessed
+
+
+def merge_extractions(extractions: Dict[str, FileExtraction]) -> MergedExtraction:
+    merged = MergedExtraction(
+        defined_macros=set(),
+        used_macros=Counter(),
+        macro_locations={},
+        index_usage={},
+        index_locations={},
+        sigma_location=None,
+        tau_location=None,
+    )
+    usage: Dict[str, Set[Tuple[str, ...]]] = defaultdict(set)
+    for path, ext in sorted(extractions.items()):
+        merged.defined_macros.update(ext.defined_macros)
+        merged.used_macros.update(ext.used_macros)
+        for name, line in ext.macro_lines.items():
+            merged.macro_locations.setdefault(name, f"{path}:{line}")
+        for base, forms in ext.index_usage.items():
+            usage[base].update(forms)
+        for base, by_arity in ext.index_lines.items():
+            for arity, line in by_arity.items():
+                merged.index_locations.setdefault(base, {}).setdefault(arity, f"{path}:{line}")
+        if merged.sigma_location is None and ext.sigma_line is not None:
+            merged.sigma_location = f"{path}:{ext.sigma_line}"
+        if merged.tau_location is None and ext.tau_line is not None:
+            merged.tau_location = f"{path}:{ext.tau_line}"
+    merged.index_usage = dict(usage)
+    return merged
 
 
 def registry_base_indexing(symbol_entry: dict) -> Set[int]:
@@ -319,16 +670,16 @@ def registry_base_indexing(symbol_entry: dict) -> Set[int]:
     return arities
 
 
-def run_checks(tex_root: Path, notation_path: Path) -> Tuple[NotationSummary, dict]:
-    files = read_tex_files(tex_root)
-
-    defined_macros: Set[str] = set()
-    used_macros: Counter = Counter()
-    all_math_chunks: List[str] = []
-    for text in files.values():
-        defined_macros.update(extract_defined_macros(text))
-        used_macros.update(extract_used_macros(text))
-        all_math_chunks.extend(extract_math_chunks(text))
+def run_checks(
+    tex_root: Path,
+    notation_path: Path,
+    cache_path: Optional[Path] = None,
+    patterns: Tuple[str, ...] = ("*.tex",),
+) -> Tuple[NotationSummary, dict]:
+    files, _reprocessed = extract_tex_tree(tex_root, cache_path, patterns)
+    merged = merge_extractions(files)
+    defined_macros = merged.defined_macros
+    used_macros = merged.used_macros
 
     symbols, registry_by_symbol = parse_registry(notation_path)
 
@@ -344,7 +695,7 @@ def run_checks(tex_root: Path, notation_path: Path) -> Tuple[NotationSummary, di
             Finding(
                 kind="undefined_macro",
                 detail=f"Macro \\{macro} is used but not defined in project macros/allowed set.",
-                location="docs/derivations/*.tex",
+                location=merged.macro_locations.get(macro, str(tex_root)),
             )
         )
 
@@ -356,12 +707,12 @@ def run_checks(tex_root: Path, notation_path: Path) -> Tuple[NotationSummary, di
                 Finding(
                     kind="registry_conflict",
                     detail=f"Symbol '{symbol}' has multiple meanings: {sorted(meanings)}",
-                    location="docs/derivations/notation.yaml",
+                    location=str(notation_path),
                 )
             )
 
     # Indexed usage consistency.
-    usage = extract_index_usage(all_math_chunks)
+    usage = merged.index_usage
     registry_base_to_index_arity: Dict[str, Set[int]] = defaultdict(set)
     for entry in symbols:
         raw_entry = str(entry.get("latex", entry.get("symbol", "")))
@@ -382,7 +733,10 @@ def run_checks(tex_root: Path, notation_path: Path) -> Tuple[NotationSummary, di
                             f"Base symbol '{base}' appears with multiple index arities {sorted(arities)} "
                             f"and registry allows {sorted(allowed_arities) if allowed_arities else 'none'}"
                         ),
-                        location="docs/derivations/*.tex",
+                        location=", ".join(
+                            f"{loc} (arity {arity})"
+                            for arity, loc in sorted(merged.index_locations.get(base, {}).items())
+                        ),
                     )
                 )
 
@@ -401,21 +755,21 @@ def run_checks(tex_root: Path, notation_path: Path) -> Tuple[NotationSummary, di
             findings.append(
                 Finding(
                     kind="registry_missing_symbol",
-                    detail=f"Indexed base symbol '{base}' appears in LaTeX but is absent in notation registry.",
-                    location="docs/derivations/notation.yaml",
+                    detail=(
+                        f"Indexed base symbol '{base}' appears in LaTeX but is absent in notation registry "
+                        f"(first use {min(merged.index_locations.get(base, {0: '?'}).values())})."
+                    ),
+                    location=str(notation_path),
                 )
             )
 
     # Parameter naming inconsistency check (sigma vs tau)
-    joined_math = "\n".join(all_math_chunks)
-    uses_sigma = bool(re.search(r"\\sigma", joined_math))
-    uses_tau = bool(re.search(r"\\tau", joined_math))
-    if uses_sigma and uses_tau:
+    if merged.sigma_location is not None and merged.tau_location is not None:
         findings.append(
             Finding(
                 kind="parameter_name_conflict",
                 detail="Both \\sigma and \\tau appear in mathematical expressions; verify they are intentionally distinct.",
-                location="docs/derivations/*.tex",
+                location=f"{merged.sigma_location}, {merged.tau_location}",
             )
         )
 
@@ -493,9 +847,22 @@ def main() -> None:
     parser.add_argument("--notation", type=Path, required=True)
     parser.add_argument("--json-output", type=Path, required=True)
     parser.add_argument("--md-output", type=Path, required=True)
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="Per-file extraction cache; unchanged files (by content hash) are not re-parsed.",
+    )
+    parser.add_argument(
+        "--pattern",
+        action="append",
+        default=None,
+        help="Glob of source files to scan under --tex-root (repeatable; default *.tex).",
+    )
     args = parser.parse_args()
 
-    summary, raw = run_checks(args.tex_root, args.notation)
+    patterns = tuple(args.pattern) if args.pattern else ("*.tex",)
+    summary, raw = run_checks(args.tex_root, args.notation, args.cache, patterns)
 
     args.json_output.parent.mkdir(parents=True, exist_ok=True)
     args.json_output.write_text(
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.special import gammaln, multigammaln, psi
+
+from checkpoint import load_checkpoint, save_checkpoint
+from conditional_ig import ig_posterior_params
+from state_space import (
+    LOG_2PI,
+    FilterResult,
+    FilterStore,
+    ModelSpec,
+    kalman_filter,
+    row_fitted,
+    row_quadratic,
+    rts_smoother,
+    source_totals,
+)
+
+
+@dataclass
+class CAVIState:
+    """Variational parameters: q(sigma_j^2) = IG(a_j, b_j), q(W_{T+k}^{(f)}) = IW(nu_k, S_k)."""
+
+    iteration: int
+    a: np.ndarray
+    b: np.ndarray
+    nu: np.ndarray
+    s: np.ndarray
+    elbo: np.ndarray
+
+
+@dataclass
+class StateFactor:
+    """Gaussian q(states): filter pass on the pseudo-model, smoothed moments, C*_{t,t-1} and E_q[u_t u_t']."""
+
+    filtered: FilterResult
+    smoothed: FilterStore
+    cross: np.ndarray
+    innovation: np.ndarray
+
+
+@dataclass
+class WarmStart:
+    """Frozen prefix t < t0 of a previous fit, reused by a refit after new data is appended.
+
+    `filtered` and `smoothed` are stores sized for the new spec with entries before t0 copied
+    from the previous fit; `n_prefix` and `sse_prefix` are the frozen rows' N_j and E_q[SSE_j].
+    """
+
+    t0: int
+    filtered: FilterStore
+    smoothed: FilterStore
+    n_prefix: np.ndarray
+    sse_prefix: np.ndarray
+
+
+def initial_cavi_state(spec: ModelSpec) -> CAVIState:
+    return CAVIState(
+        iteration=0,
+        a=spec.a0.astype(float),
+        b=spec.b0.astype(float),
+        nu=spec.nu0.astype(float),
+        s=spec.s0.astype(float),
+        elbo=np.zeros(0),
+    )
+
+
+def pseudo_variances(state: CAVIState) -> Tuple[np.ndarray, np.ndarray]:
+    """E_q[1/sigma_j^2]^{-1} and the forecast pseudo-covariances E_q[W^{-1}]^{-1} = S / nu."""
+    return state.b / state.a, state.s / state.nu[:, None, None]
+
+
+def smooth_state_factor(spec: ModelSpec, state: CAVIState, warm: Optional[WarmStart] = None) -> StateFactor:
+    """q(states) from the pseudo-model; with `warm`, only t >= t0 is re-filtered and re-smoothed.
+
+    In the warm case `filtered.loglik` covers only the re-filtered tail.
+    """
+    sigma2_bar, w_bar = pseudo_variances(state)
+    t0 = 0 if warm is None else warm.t0
+    filtered = kalman_filter(
+        spec.with_variances(sigma2_bar),
+        spec.g,
+        spec.transition_covariances(w_bar),
+        spec.m0 if warm is None else warm.filtered.m[t0 - 1],
+        spec.c0 if warm is None else warm.filtered.c[t0 - 1],
+        spec.t_max,
+        store=None if warm is None else warm.filtered,
+        t_start=max(t0 - 1, 0),
+    )
+    cross = np.zeros((spec.t_max + 1, spec.d, spec.d))
+    innovation = np.zeros_like(cross)
+    smoothed = rts_smoother(
+        filtered.store,
+        spec.g,
+        out=None if warm is None else warm.smoothed,
+        t_min=t0,
+        cross=cross,
+        innovation=innovation,
+    )
+    return StateFactor(filtered=filtered, smoothed=smoothed, cross=cross, innovation=innovation)
+
+
+def expected_sse(spec: ModelSpec, factor: StateFactor, t_min: int = 0, t_stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """N_j and E_q[SSE_j] = sum (y - h'm*)^2 + h'C*h over each source's rows, weighted by 1 / scale.
+
+    Only rows with t_min <= t < t_stop are included.
+    """
+    obs = spec.obs.time_window(t_min, spec.t_max if t_stop is None else t_stop - 1)
+    resid = obs.y - row_fitted(obs, factor.smoothed.m)
+    return source_totals(obs, (resid * resid + row_quadratic(obs, factor.smoothed.c)) / obs.r, spec.n_sources)
+
+
+def expected_innovation_outer(spec: ModelSpec, factor: StateFactor) -> np.ndarray:
+    """E_q[u_{T+k} u_{T+k}'] from eq:vb_state_moments for k = 1..K, as emitted by the smoother."""
+    return factor.innovation[spec.t_hist + 1 : spec.t_max + 1]
+
+
+def _kl_gamma(a: np.ndarray, b: np.ndarray, a0: np.ndarray, b0: np.ndarray) -> np.ndarray:
+    """KL(IG(a, b) || IG(a0, b0)), i.e. the Gamma KL for the precisions."""
+    return (a - a0) * psi(a) - gammaln(a) + gammaln(a0) + a0 * (np.log(b) - np.log(b0)) + a * (b0 - b) / b
+
+
+def _kl_inverse_wishart(nu: np.ndarray, s: np.ndarray, nu0: np.ndarray, s0: np.ndarray) -> np.ndarray:
+    """KL(IW(nu, S) || IW(nu0, S0)), i.e. the Wishart KL for the precisions W^{-1}."""
+    d = s.shape[-1]
+    _sign, logdet_s = np.linalg.slogdet(s)
+    _sign0, logdet_s0 = np.linalg.slogdet(s0)
+    trace = np.trace(np.linalg.solve(s, s0), axis1=-2, axis2=-1)
+    psi_d = sum(psi(0.5 * (nu - i)) for i in range(d))
+    return (
+        0.5 * nu0 * (logdet_s - logdet_s0)
+        + 0.5 * nu * (trace - d)
+        + np.array([multigammaln(0.5 * v, d) for v in nu0])
+        - np.array([multigammaln(0.5 * v, d) for v in nu])
+        + 0.5 * (nu - nu0) * psi_d
+    )
+
+
+def elbo(spec: ModelSpec, state: CAVIState, pseudo_loglik: float, warm: Optional[WarmStart] = None) -> float:
+    """ELBO at the optimal state factor for the current q(sigma^2), q(W^{(f)}).
+
+    With q(states) the pseudo-model smoother, the state-dependent terms of eq:elbo_blocks
+    collapse to the pseudo-model marginal likelihood plus E_q[log] corrections for replacing
+    sigma_j^2 and W^{(f)} by their expected-precision pseudo-values, minus the KL terms.
+    With `warm`, `pseudo_loglik` covers only t >= t0 and the frozen prefix enters through its
+    expected log-likelihood -0.5 (N_j (log 2 pi + E_q[log sigma_j^2]) + E_q[1/sigma_j^2] E_q[SSE_j]).
+    """
+    d = spec.d
+    obs = spec.obs
+    counts = np.bincount(obs.source, weights=obs.replicate_counts(), minlength=spec.n_sources)
+    e_log_sigma2 = np.log(state.b) - psi(state.a)
+    if warm is not None:
+        counts = counts - warm.n_prefix
+        pseudo_loglik += float(
+            np.sum(-0.5 * (warm.n_prefix * (LOG_2PI + e_log_sigma2) + state.a / state.b * warm.sse_prefix))
+        )
+    sigma_corr = -0.5 * counts * (e_log_sigma2 - np.log(state.b / state.a))
+    if obs.within is not None:
+        # Within-replicate terms of eq:sse_decomposition at the pseudo-variances (up to constants).
+        n_within = np.bincount(obs.source, weights=obs.count - 1.0, minlength=spec.n_sources)
+        within = np.bincount(obs.source, weights=obs.within, minlength=spec.n_sources)
+        pseudo_loglik += float(np.sum(-0.5 * (n_within * (LOG_2PI + np.log(state.b / state.a)) + within * state.a / state.b)))
+
+    _sign, logdet_s = np.linalg.slogdet(state.s)
+    e_logdet_w = logdet_s - d * np.log(2.0) - sum(psi(0.5 * (state.nu - i)) for i in range(d))
+    logdet_w_bar = logdet_s - d * np.log(state.nu)
+    w_corr = -0.5 * (e_logdet_w - logdet_w_bar)
+
+    kl = np.sum(_kl_gamma(state.a, state.b, spec.a0, spec.b0)) + np.sum(
+        _kl_inverse_wishart(state.nu, state.s, spec.nu0, spec.s0)
+    )
+    return float(pseudo_loglik + np.sum(sigma_corr) + np.sum(w_corr) - kl)
+
+
+def cavi_step(spec: ModelSpec, state: CAVIState, warm: Optional[WarmStart] = None) -> CAVIState:
+    """Update q(states), then q(sigma_j^2) (eq:vb_sigma) and q(W_{T+k}^{(f)}) (eq:vb_W_fcast).
+
+    The recorded ELBO is evaluated right after the state update. With `warm` the frozen prefix
+    contributes fixed N_j and E_q[SSE_j]; its filter log-likelihood is replaced in the ELBO by
+    the expected log-likelihood of those rows under the current q(sigma^2).
+    """
+    factor = smooth_state_factor(spec, state, warm)
+    value = elbo(spec, state, factor.filtered.loglik, warm)
+    if warm is None:
+        n, e_sse = expected_sse(spec, factor)
+    else:
+        n, e_sse = expected_sse(spec, factor, t_min=warm.t0)
+        n, e_sse = n + warm.n_prefix, e_sse + warm.sse_prefix
+    a, b = ig_posterior_params(spec.a0, spec.b0, n, e_sse)
+    nu = spec.nu0 + 1.0
+    s = spec.s0 + expected_innovation_outer(spec, factor)
+    return CAVIState(iteration=state.iteration + 1, a=a, b=b, nu=nu, s=s, elbo=np.append(state.elbo, value))
+
+
+def converged(elbo_trace: np.ndarray, tol: float) -> bool:
+    if elbo_trace.shape[0] < 2:
+        return False
+    return abs(elbo_trace[-1] - elbo_trace[-2]) <= tol * (1.0 + abs(elbo_trace[-1]))
+
+
+def save_cavi_checkpoint(path: Path, state: CAVIState) -> None:
+    arrays = {"a": state.a, "b": state.b, "nu": state.nu, "s": state.s, "elbo": state.elbo}
+    save_checkpoint(path, arrays, {"kind": "cavi", "iteration": state.iteration})
+
+
+def load_cavi_checkpoint(path: Path) -> CAVIState:
+    arrays, meta = load_checkpoint(path)
+    if meta["kind"] != "cavi":
+        raise ValueError(f"{path} is a {meta['kind']} checkpoint, not cavi")
+    return CAVIState(iteration=meta["iteration"], **arrays)
+
+
+def run_cavi(
+    spec: ModelSpec,
+    max_iter: int = 200,
+    tol: float = 1e-10,
+    state: Optional[CAVIState] = None,
+    checkpoint_path: Optional[Path] = None,
+    checkpoint_every: int = 1,
+    warm: Optional[WarmStart] = None,
+) -> CAVIState:
+    """Iterate CAVI until the relative ELBO change is below `tol` or `max_iter` total iterations.
+
+    Pass `state=load_cavi_checkpoint(path)` to resume; the iterates are deterministic, so the
+    continuation matches an uninterrupted run exactly. See `warm_start` for incremental refits.
+    """
+    state = initial_cavi_state(spec) if state is None else state
+    while state.iteration < max_iter and not converged(state.elbo, tol):
+        state = cavi_step(spec, state, warm)
+        if checkpoint_path is not None and state.iteration % checkpoint_every == 0:
+            save_cavi_checkpoint(checkpoint_path, state)
+    if checkpoint_path is not None:
+        save_cavi_checkpoint(checkpoint_path, state)
+    return state
+
+
+def warm_start(
+    prev_spec: ModelSpec,
+    prev_state: CAVIState,
+    prev_factor: StateFactor,
+    spec: ModelSpec,
+    window: int,
+) -> Tuple[CAVIState, WarmStart]:
+    """Initialise a refit of `spec` (= `prev_spec` plus appended time steps) from a previous fit.
+
+    q(sigma_j^2) and q(W_{T+k}^{(f)}) start at the previous optimum. The state factor before
+    t0 = T_prev - window + 1 is frozen at the previous fit, so each iteration re-filters and
+    re-smooths (eq:vb_state_moments) only the last `window` old steps plus the new data and the
+    forecast block. `window = T_prev` recovers a full CAVI refit.
+    """
+    if spec.t_hist < prev_spec.t_hist or spec.n_leads != prev_spec.n_leads or spec.d != prev_spec.d:
+        raise ValueError("Warm starts need the same state dimension and leads and a history that only grows")
+    t0 = prev_spec.t_hist - window + 1
+    if not 1 <= t0 <= prev_spec.t_hist:
+        raise ValueError(f"window must be in 1..{prev_spec.t_hist}, got {window}")
+    filtered = FilterStore(spec.t_max, spec.d)
+    smoothed = FilterStore(spec.t_max, spec.d)
+    a, r, m, c = prev_factor.filtered.store.read(0, t0)
+    filtered.write_block(0, a=a, r=r, m=m, c=c)
+    smoothed.write_block(0, m=np.asarray(prev_factor.smoothed.m[:t0]), c=np.asarray(prev_factor.smoothed.c[:t0]))
+    n_prefix, sse_prefix = expected_sse(prev_spec, prev_factor, t_stop=t0)
+    state = CAVIState(
+        iteration=0,
+        a=prev_state.a.copy(),
+        b=prev_state.b.copy(),
+        nu=prev_state.nu.copy(),
+        s=prev_state.s.copy(),
+        elbo=np.zeros(0),
+    )
+    return state, WarmStart(t0=t0, filtered=filtered, smoothed=smoothed, n_prefix=n_prefix, sse_prefix=sse_prefix)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+
+
+def rng_state(rng: np.random.Generator) -> dict:
+    return rng.bit_generator.state
+
+
+def restore_rng(state: dict) -> np.random.Generator:
+    """Rebuild a Generator whose stream continues exactly where `state` was captured."""
+    bit_generator = getattr(np.random, state["bit_generator"])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+
+def save_checkpoint(path: Path, arrays: Dict[str, np.ndarray], meta: dict) -> None:
+    """Atomically write arrays plus JSON metadata (tmp file, fsync, rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    payload = dict(arrays)
+    payload["__meta__"] = np.array(json.dumps({"version": CHECKPOINT_VERSION, **meta}, sort_keys=True))
+    with open(tmp_path, "wb") as handle:
+        np.savez(handle, **payload)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: Path) -> Tuple[Dict[str, np.ndarray], dict]:
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files if key != "__meta__"}
+        meta = json.loads(str(data["__meta__"]))
+    if meta.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {path}: {meta.get('version')}")
+    return arrays, meta
+
+
+class TraceWriter:
+    """Append-only float64 traces, one raw file per quantity with fixed row shape.
+
+    `cursor` counts complete rows; it is stored in checkpoints, and reopening with a cursor
+    truncates rows written after that checkpoint so a resumed run appends seamlessly.
+    """
+
+    def __init__(self, directory: Path, shapes: Dict[str, Tuple[int, ...]], cursor: int = 0) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.shapes = dict(shapes)
+        self.cursor = cursor
+        self._handles = {}
+        for name, shape in self.shapes.items():
+            path = self.directory / f"{name}.f64"
+            row_bytes = 8 * int(np.prod(shape, dtype=np.int64))
+            if path.exists():
+                if path.stat().st_size < cursor * row_bytes:
+                    raise ValueError(f"Trace {path} is shorter than checkpoint cursor {cursor}")
+                os.truncate(path, cursor * row_bytes)
+            elif cursor:
+                raise ValueError(f"Trace {path} is missing for checkpoint cursor {cursor}")
+            self._handles[name] = open(path, "ab")
+
+    def append(self, **rows: np.ndarray) -> None:
+        for name, handle in self._handles.items():
+            handle.write(np.ascontiguousarray(rows[name], dtype=np.float64).tobytes())
+        self.cursor += 1
+
+    def flush(self) -> None:
+        for handle in self._handles.values():
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def close(self) -> None:
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+
+def read_trace(directory: Path, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+    return np.fromfile(Path(directory) / f"{name}.f64", dtype=np.float64).reshape((-1,) + tuple(shape))
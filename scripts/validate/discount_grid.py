@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from common import ValidationResult
+from state_space import LOG_2PI, VARIANCE_FLOOR, ObservationList, assimilate, kalman_filter, transition_at
+
+# A discount block is the half-open component range [start, stop) sharing one discount factor.
+Block = Tuple[int, int]
+
+
+def discount_mask(d: int, blocks: Sequence[Block], deltas: np.ndarray) -> np.ndarray:
+    """(n_grid, d, d) factors (1 - delta_b) / delta_b on each block's diagonal square, 0 elsewhere.
+
+    With P_t = G_t C_{t-1} G_t', the discount-induced evolution covariance is W_t = P_t * mask
+    (elementwise), i.e. W_t[b, b] = P_t[b, b] (1 - delta_b) / delta_b, and R_t = P_t * (1 + mask).
+    """
+    deltas = np.atleast_2d(np.asarray(deltas, dtype=float))
+    mask = np.zeros((deltas.shape[0], d, d))
+    for k, (start, stop) in enumerate(blocks):
+        mask[:, start:stop, start:stop] = ((1.0 - deltas[:, k]) / deltas[:, k])[:, None, None]
+    return mask
+
+
+def discount_filter(
+    obs: ObservationList,
+    g: np.ndarray,
+    blocks: Sequence[Block],
+    delta: np.ndarray,
+    m0: np.ndarray,
+    c0: np.ndarray,
+    t_max: int,
+) -> Tuple[float, np.ndarray]:
+    """Single-configuration reference: log-likelihood and the induced W_t stack (index 0 unused)."""
+    mask = discount_mask(m0.shape[0], blocks, delta)[0]
+    offsets = obs.time_offsets(t_max)
+    m, c = np.asarray(m0, dtype=float), np.asarray(c0, dtype=float)
+    w = np.zeros((t_max + 1,) + c.shape)
+    loglik = 0.0
+    for t in range(1, t_max + 1):
+        g_t = transition_at(g, t)
+        p = g_t @ c @ g_t.T
+        w[t] = 0.5 * (p + p.T) * mask
+        sl = slice(offsets[t], offsets[t + 1])
+        h_index = None if obs.h_index is None else obs.h_index[sl]
+        m, c, ll = assimilate(g_t @ m, p + w[t], obs.y[sl], obs.h[sl], obs.r[sl], h_index)
+        loglik += ll
+    return loglik, w
+
+
+def batched_discount_loglik(
+    obs: ObservationList,
+    g: np.ndarray,
+    mask: np.ndarray,
+    m0: np.ndarray,
+    c0: np.ndarray,
+    t_max: int,
+) -> np.ndarray:
+    """Prediction-error-decomposition log-likelihood (eq:one_step_pred) for every grid row at once.
+
+    Means are (n_grid, d) and covariances (n_grid, d, d); each scalar observation updates the
+    whole grid with batched products, so one pass over the data serves all configurations.
+    """
+    n_grid, d = mask.shape[0], m0.shape[0]
+    offsets = obs.time_offsets(t_max)
+    m = np.broadcast_to(np.asarray(m0, dtype=float), (n_grid, d)).copy()
+    c = np.broadcast_to(np.asarray(c0, dtype=float), (n_grid, d, d)).copy()
+    inflate = 1.0 + mask
+    loglik = np.zeros(n_grid)
+    for t in range(1, t_max + 1):
+        g_t = transition_at(g, t)
+        p = g_t @ c @ g_t.T
+        c = 0.5 * (p + np.swapaxes(p, -1, -2)) * inflate
+        m = m @ g_t.T
+        for i in range(offsets[t], offsets[t + 1]):
+            idx, hv = obs.row(i)
+            ch = c[:, :, idx] @ hv
+            f = np.maximum(ch[:, idx] @ hv + obs.r[i], VARIANCE_FLOOR)
+            e = obs.y[i] - m[:, idx] @ hv
+            k = ch / f[:, None]
+            m = m + k * e[:, None]
+            c = c - k[:, :, None] * ch[:, None, :]
+            loglik -= 0.5 * (LOG_2PI + np.log(f) + e * e / f)
+        c = 0.5 * (c + np.swapaxes(c, -1, -2))
+    return loglik
+
+
+def _chunk_loglik(args: Tuple[ObservationList, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]) -> np.ndarray:
+    return batched_discount_loglik(*args)
+
+
+def discount_grid_loglik(
+    obs: ObservationList,
+    g: np.ndarray,
+    blocks: Sequence[Block],
+    deltas: np.ndarray,
+    m0: np.ndarray,
+    c0: np.ndarray,
+    t_max: int,
+    chunk_size: int = 64,
+    max_workers: int = 1,
+) -> np.ndarray:
+    """Log-likelihoods for an (n_grid, n_blocks) array of discount factors.
+
+    The grid is split into chunks of `chunk_size` rows, each filtered as one batch; with
+    `max_workers > 1` chunks run on a process pool. `obs.r` must already hold variances.
+    """
+    deltas = np.atleast_2d(np.asarray(deltas, dtype=float))
+    if np.any((deltas <= 0.0) | (deltas > 1.0)):
+        raise ValueError("Discount factors must lie in (0, 1]")
+    mask = discount_mask(m0.shape[0], blocks, deltas)
+    chunks: List[Tuple[ObservationList, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]] = [
+        (obs, g, mask[i : i + chunk_size], m0, c0, t_max) for i in range(0, deltas.shape[0], chunk_size)
+    ]
+    if max_workers <= 1 or len(chunks) == 1:
+        return np.concatenate([_chunk_loglik(chunk) for chunk in chunks])
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return np.concatenate(list(pool.map(_chunk_loglik, chunks)))
+
+
+def product_grid(*axes: Sequence[float]) -> np.ndarray:
+    """All combinations of per-block discount candidates as an (n_grid, n_blocks) array."""
+    mesh = np.meshgrid(*[np.asarray(axis, dtype=float) for axis in axes], indexing="ij")
+    return np.stack([axis.ravel() for axis in mesh], axis=1)
+
+
+def simulate_discount_system(
+    rng: np.random.Generator,
+    t_max: int,
+    blocks: Sequence[Block],
+    delta: np.ndarray,
+    n_sources: int = 3,
+) -> Tuple[ObservationList, np.ndarray, np.ndarray, np.ndarray]:
+    """Data from a block-discount DLM; returns (obs with variances, G, m0, C0)."""
+    d = blocks[-1][1]
+    g = 0.97 * np.eye(d) + 0.05 * np.eye(d, k=1)
+    m0, c0 = np.zeros(d), np.eye(d)
+    h = rng.normal(size=(n_sources, d))
+    r = rng.uniform(0.2, 0.6, size=n_sources)
+    mask = discount_mask(d, blocks, delta)[0]
+    x = rng.multivariate_normal(m0, c0)
+    c = c0.copy()
+    rows = []
+    for t in range(1, t_max + 1):
+        # Evolution noise drawn from the discount covariance of a unit-prior reference filter.
+        p = g @ c @ g.T
+        w = 0.5 * (p + p.T) * mask
+        x = g @ x + rng.multivariate_normal(np.zeros(d), w + 1e-12 * np.eye(d))
+        c = p + w
+        for j in range(n_sources):
+            rows.append((t, j, float(h[j] @ x + rng.normal(scale=math.sqrt(r[j]))), h[j], r[j], j))
+            f = float(h[j] @ c @ h[j]) + r[j]
+            ch = c @ h[j]
+            c = c - np.outer(ch, ch) / f
+    return ObservationList.from_tuples(rows), g, m0, c0
+
+
+def run(rng: np.random.Generator, t_max: int = 80) -> ValidationResult:
+    blocks = [(0, 2), (2, 4), (4, 6)]
+    truth = np.array([0.95, 0.9, 0.98])
+    obs, g, m0, c0 = simulate_discount_system(rng, t_max, blocks, truth)
+    grid = product_grid([0.9, 0.95, 0.98], [0.85, 0.9, 0.95], [0.95, 0.98, 1.0])
+
+    batched = discount_grid_loglik(obs, g, blocks, grid, m0, c0, t_max, chunk_size=10)
+    pooled = discount_grid_loglik(obs, g, blocks, grid, m0, c0, t_max, chunk_size=10, max_workers=2)
+    loop = np.array([discount_filter(obs, g, blocks, delta, m0, c0, t_max)[0] for delta in grid])
+    batch_err = float(np.max(np.abs(batched - loop)))
+    pool_err = float(np.max(np.abs(pooled - batched)))
+
+    # The induced W_t are ordinary known inputs: feeding them to the engine reproduces the log-likelihood.
+    best = int(np.argmax(batched))
+    ll_best, w_best = discount_filter(obs, g, blocks, grid[best], m0, c0, t_max)
+    engine_err = abs(kalman_filter(obs, g, w_best, m0, c0, t_max).loglik - ll_best)
+
+    passed = batch_err < 1e-8 and pool_err == 0.0 and engine_err < 1e-8
+    details = (
+        "Batched discount-grid log-likelihoods disagree with per-configuration filters"
+        if not passed
+        else "Grid-batched discount filters match per-configuration prediction-error log-likelihoods."
+    )
+
+    return ValidationResult(
+        name="discount_grid_marginal_likelihood",
+        passed=passed,
+        equation_refs=(
+            "docs/derivations/sections/09_predictive.tex:eq:one_step_pred;"
+            "docs/derivations/sections/03_state_posterior_ffbs.tex:eq:kf_f,eq:kf_K,eq:kf_m,eq:kf_C"
+        ),
+        details=details,
+        diagnostics={
+            "n_grid": float(grid.shape[0]),
+            "max_abs_batched_vs_loop_error": batch_err,
+            "max_abs_pooled_vs_serial_error": pool_err,
+            "abs_engine_loglik_error": engine_err,
+            "best_deltas": grid[best].tolist(),
+            "true_deltas": truth.tolist(),
+        },
+    )
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict
+
+import numpy as np
+
+from common import ValidationResult
+from state_space import LOG_2PI, VARIANCE_FLOOR, ObservationList, kalman_filter
+
+
+@dataclass
+class EnsembleFilterResult:
+    """Filtered means for every series, final covariances and per-series log-likelihoods.
+
+    `m` and `c` are stored in the compute dtype; `loglik` is always float64.
+    """
+
+    m: np.ndarray
+    c: np.ndarray
+    loglik: np.ndarray
+    dtype: np.dtype
+    guard: Dict[str, float] = field(default_factory=dict)
+
+
+def batched_filter(
+    y: np.ndarray,
+    h: np.ndarray,
+    r: np.ndarray,
+    g: np.ndarray,
+    q: np.ndarray,
+    m0: np.ndarray,
+    c0: np.ndarray,
+    dtype: type = np.float64,
+) -> EnsembleFilterResult:
+    """Kalman filter for S independent series sharing (G, Q, h) with series-specific variances.
+
+    `y` is (S, T, p) with NaN for missing values, `h` is (p, d) and `r` is (S, p). Means and
+    covariances are stored and propagated through G in `dtype`; each step's measurement
+    updates work on a float64 copy of C, so innovations, innovation variances, gains, the
+    rank-one covariance downdates and the log-likelihood sums are all accumulated in float64
+    (eq:kf_f--eq:kf_C per scalar row).
+    """
+    dt = np.dtype(dtype)
+    n_series, t_max, p = y.shape
+    d = m0.shape[-1]
+    g_c = np.asarray(g, dtype=dt)
+    gt_c = np.ascontiguousarray(g_c.T)
+    q_c = np.asarray(q, dtype=dt)
+    h_c = np.asarray(h, dtype=dt)
+    r64 = np.broadcast_to(np.asarray(r, dtype=np.float64), (n_series, p))
+
+    m = np.empty((n_series, t_max + 1, d), dtype=dt)
+    m[:, 0] = m0
+    c = np.broadcast_to(np.asarray(c0, dtype=dt), (n_series, d, d)).copy()
+    loglik = np.zeros(n_series)
+    observed = ~np.isnan(y)
+
+    for t in range(1, t_max + 1):
+        m_t = m[:, t - 1] @ gt_c
+        c64 = (g_c @ c @ gt_c + q_c).astype(np.float64)
+        for n in range(p):
+            ok = observed[:, t - 1, n]
+            ch = c64 @ h[n]
+            f = np.maximum(ch @ h[n] + r64[:, n], VARIANCE_FLOOR)
+            e = np.where(ok, y[:, t - 1, n] - m_t.astype(np.float64) @ h[n], 0.0)
+            gain = (ch / f[:, None]) * ok[:, None]
+            m_t = m_t + (gain * e[:, None]).astype(dt)
+            c64 = c64 - gain[:, :, None] * ch[:, None, :]
+            loglik -= np.where(ok, 0.5 * (LOG_2PI + np.log(f) + e * e / f), 0.0)
+        c = (0.5 * (c64 + np.swapaxes(c64, -1, -2))).astype(dt)
+        m[:, t] = m_t
+    return EnsembleFilterResult(m=m, c=c, loglik=loglik, dtype=dt)
+
+
+def accuracy_guard(
+    rng: np.random.Generator,
+    result: EnsembleFilterResult,
+    y: np.ndarray,
+    h: np.ndarray,
+    r: np.ndarray,
+    g: np.ndarray,
+    q: np.ndarray,
+    m0: np.ndarray,
+    c0: np.ndarray,
+    n_check: int = 8,
+    mean_tol: float = 1e-3,
+    loglik_tol: float = 1e-4,
+    cov_tol: float = 1e-3,
+) -> Dict[str, float]:
+    """Re-filter a random subset of series in float64 and compare, kalman_bruteforce style.
+
+    Errors are scaled as |low - ref| / (1 + |ref|); the guard passes when the state-mean,
+    final-covariance and log-likelihood errors are all below their tolerances.
+    """
+    idx = rng.choice(y.shape[0], size=min(n_check, y.shape[0]), replace=False)
+    ref = batched_filter(y[idx], h, np.asarray(r)[idx], g, q, m0, c0, dtype=np.float64)
+    low_m = result.m[idx].astype(np.float64)
+    max_mean_err = float(np.max(np.abs(low_m - ref.m) / (1.0 + np.abs(ref.m))))
+    low_c = result.c[idx].astype(np.float64)
+    max_cov_err = float(np.max(np.abs(low_c - ref.c) / (1.0 + np.abs(ref.c))))
+    max_loglik_err = float(np.max(np.abs(result.loglik[idx] - ref.loglik) / (1.0 + np.abs(ref.loglik))))
+    passed = max_mean_err < mean_tol and max_cov_err < cov_tol and max_loglik_err < loglik_tol
+    return {
+        "n_checked": float(idx.size),
+        "max_scaled_mean_error": max_mean_err,
+        "max_scaled_cov_error": max_cov_err,
+        "max_scaled_loglik_error": max_loglik_err,
+        "passed": float(passed),
+    }
+
+
+def filter_ensemble(
+    rng: np.random.Generator,
+    y: np.ndarray,
+    h: np.ndarray,
+    r: np.ndarray,
+    g: np.ndarray,
+    q: np.ndarray,
+    m0: np.ndarray,
+    c0: np.ndarray,
+    precision: str = "float32",
+    n_check: int = 8,
+    mean_tol: float = 1e-3,
+    loglik_tol: float = 1e-4,
+    cov_tol: float = 1e-3,
+) -> EnsembleFilterResult:
+    """Ensemble filter in `precision` ("float32" or "float64") with an automatic accuracy guard.
+
+    In float32 mode a sampled subset is checked against the float64 engine; if the guard fails
+    the whole ensemble is re-run in float64 and `guard["fallback"]` is set.
+    """
+    if precision not in ("float32", "float64"):
+        raise ValueError(f"Unknown precision: {precision}")
+    dtype = np.float32 if precision == "float32" else np.float64
+    result = batched_filter(y, h, r, g, q, m0, c0, dtype=dtype)
+    if dtype is np.float64:
+        return result
+    guard = accuracy_guard(rng, result, y, h, r, g, q, m0, c0, n_check, mean_tol, loglik_tol, cov_tol)
+    if not guard["passed"]:
+        result = batched_filter(y, h, r, g, q, m0, c0, dtype=np.float64)
+    guard["fallback"] = float(not guard["passed"])
+    result.guard = guard
+    return result
+
+
+def simulate_ensemble(
+    rng: np.random.Generator,
+    n_series: int,
+    t_max: int,
+    d: int = 4,
+    p: int = 3,
+    missing: float = 0.1,
+):
+    """Shared (G, Q, h), series-specific variances; returns (y, h, r, g, q, m0, c0)."""
+    g = 0.95 * np.eye(d) + 0.05 * np.eye(d, k=1)
+    q = 0.05 * np.eye(d)
+    h = rng.normal(size=(p, d))
+    r = rng.uniform(0.2, 1.0, size=(n_series, p))
+    m0 = np.zeros(d)
+    c0 = np.eye(d)
+    x = rng.normal(size=(n_series, d))
+    y = np.empty((n_series, t_max, p))
+    chol_q = math.sqrt(0.05)
+    for t in range(t_max):
+        x = x @ g.T + chol_q * rng.normal(size=(n_series, d))
+        y[:, t] = x @ h.T + np.sqrt(r) * rng.normal(size=(n_series, p))
+    y[rng.uniform(size=y.shape) < missing] = np.nan
+    return y, h, r, g, q, m0, c0
+
+
+def run(rng: np.random.Generator, n_series: int = 2000, t_max: int = 60) -> ValidationResult:
+    y, h, r, g, q, m0, c0 = simulate_ensemble(rng, n_series, t_max)
+
+    # The batched float64 path must agree with the scalar-observation engine.
+    obs_rows = [
+        (t, n, y[0, t - 1, n], h[n], r[0, n], n)
+        for t in range(1, t_max + 1)
+        for n in range(h.shape[0])
+        if not np.isnan(y[0, t - 1, n])
+    ]
+    single = kalman_filter(ObservationList.from_tuples(obs_rows), g, q, m0, c0, t_max)
+
+    ref = batched_filter(y, h, r, g, q, m0, c0, dtype=np.float64)
+    low = filter_ensemble(rng, y, h, r, g, q, m0, c0, precision="float32")
+
+    engine_mean_err = float(np.max(np.abs(ref.m[0] - single.store.m)))
+    engine_loglik_err = abs(float(ref.loglik[0]) - single.loglik)
+    full_mean_err = float(np.max(np.abs(low.m.astype(np.float64) - ref.m) / (1.0 + np.abs(ref.m))))
+    full_loglik_err = float(np.max(np.abs(low.loglik - ref.loglik) / (1.0 + np.abs(ref.loglik))))
+    full_cov_err = float(np.max(np.abs(low.c.astype(np.float64) - ref.c) / (1.0 + np.abs(ref.c))))
+
+    passed = (
+        engine_mean_err < 1e-8
+        and engine_loglik_err < 1e-8
+        and low.guard["passed"] == 1.0
+        and full_mean_err < 1e-3
+        and full_loglik_err < 1e-4
+        and full_cov_err < 1e-3
+    )
+    details = (
+        "Float32 ensemble filter failed the accuracy guard or the float64 batched engine is inconsistent"
+        if not passed
+        else "Float32 ensemble filtering stays within guard tolerances of the float64 engine."
+    )
+
+    return ValidationResult(
+        name="ensemble_filter_float32_guard",
+        passed=passed,
+        equation_refs="docs/derivations/sections/03_state_posterior_ffbs.tex:eq:kf_f,eq:kf_K,eq:kf_m,eq:kf_C",
+        details=details,
+        diagnostics={
+            "n_series": float(n_series),
+            "t_max": float(t_max),
+            "max_abs_batched_vs_scalar_mean_error": engine_mean_err,
+            "abs_batched_vs_scalar_loglik_error": engine_loglik_err,
+            "max_scaled_float32_mean_error": full_mean_err,
+            "max_scaled_float32_loglik_error": full_loglik_err,
+            "max_scaled_float32_cov_error": full_cov_err,
+            "guard": low.guard,
+            "float32_bytes_ratio": float(low.m.nbytes) / float(ref.m.nbytes),
+        },
+    )
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from checkpoint import TraceWriter, load_checkpoint, restore_rng, rng_state, save_checkpoint
+from conditional_ig import ig_posterior_params, sample_ig_batched
+from conditional_iw import iw_posterior_params, sample_iw_batched
+from state_moments import StateMoments, state_subset
+from state_space import (
+    FilterStore,
+    ModelSpec,
+    ffbs_sample,
+    kalman_filter,
+    row_fitted,
+    rts_smoother,
+    source_totals,
+    transition_at,
+)
+
+
+@dataclass
+class GibbsState:
+    iteration: int
+    x: np.ndarray
+    sigma2: np.ndarray
+    w_fcast: np.ndarray
+    moments: Optional[StateMoments] = None
+
+
+def initial_state(spec: ModelSpec) -> GibbsState:
+    """Start from prior means of sigma_j^2 and W_{T+k}^{(f)} and a zero state path."""
+    d = spec.d
+    return GibbsState(
+        iteration=0,
+        x=np.zeros((spec.t_max + 1, d)),
+        sigma2=spec.b0 / (spec.a0 - 1.0),
+        w_fcast=spec.s0 / (spec.nu0 - d - 1.0)[:, None, None],
+    )
+
+
+def source_sse(spec: ModelSpec, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """N_j and SSE_j by source for a state path; aggregated rows are weighted by 1 / scale."""
+    resid = spec.obs.y - row_fitted(spec.obs, x)
+    return source_totals(spec.obs, resid * resid / spec.obs.r, spec.n_sources)
+
+
+def forecast_innovations(spec: ModelSpec, x: np.ndarray) -> np.ndarray:
+    """u_{T+k}^{(f)} = x_{T+k} - G_{T+k} x_{T+k-1} for k = 1..K (eq:fcast_innovation)."""
+    times = range(spec.t_hist + 1, spec.t_max + 1)
+    return np.stack([x[t] - transition_at(spec.g, t) @ x[t - 1] for t in times])
+
+
+def accumulate_state_moments(spec: ModelSpec, moments: StateMoments, store: FilterStore, x: np.ndarray) -> None:
+    """Add the sweep's FFBS draw, or in Rao-Blackwell mode the smoothed moments given the same
+    sigma^2 and W^{(f)} (one extra backward pass, no random numbers)."""
+    if not moments.rao_blackwell:
+        moments.update(x)
+        return
+    cross = np.zeros((spec.t_max + 1, spec.d, spec.d)) if moments.lags else None
+    smoothed = rts_smoother(store, spec.g, cross=cross)
+    moments.update(smoothed.m, smoothed.c, cross)
+
+
+def gibbs_sweep(rng: np.random.Generator, spec: ModelSpec, state: GibbsState) -> GibbsState:
+    """One blocked sweep: FFBS states, then sigma_j^2 (eq:cond_sigma), then W_{T+k}^{(f)} (eq:cond_W_fcast).
+
+    A moment accumulator on `state` is updated in place once the sweep is past its burn-in.
+    """
+    q = spec.transition_covariances(state.w_fcast)
+    filt = kalman_filter(spec.with_variances(state.sigma2), spec.g, q, spec.m0, spec.c0, spec.t_max)
+    x = ffbs_sample(rng, filt.store, spec.g)
+    if state.moments is not None and state.iteration + 1 > state.moments.burn_in:
+        accumulate_state_moments(spec, state.moments, filt.store, x)
+    n, sse = source_sse(spec, x)
+    sigma2 = sample_ig_batched(rng, *ig_posterior_params(spec.a0, spec.b0, n, sse))
+    w_fcast = sample_iw_batched(rng, *iw_posterior_params(spec.nu0, spec.s0, forecast_innovations(spec, x)))
+    return GibbsState(iteration=state.iteration + 1, x=x, sigma2=sigma2, w_fcast=w_fcast, moments=state.moments)
+
+
+def trace_shapes(
+    spec: ModelSpec, trace_states: bool, subset: Optional[Tuple[np.ndarray, np.ndarray]] = None
+) -> Dict[str, Tuple[int, ...]]:
+    """Row shapes per traced quantity; states are traced only on the retained (times, coords) subset."""
+    shapes: Dict[str, Tuple[int, ...]] = {
+        "sigma2": (spec.n_sources,),
+        "w_fcast": (spec.n_leads, spec.d, spec.d),
+    }
+    if trace_states:
+        times, coords = state_subset(spec.t_max, spec.d) if subset is None else subset
+        shapes["x"] = (times.size, coords.size)
+    return shapes
+
+
+def save_gibbs_checkpoint(
+    path: Path,
+    rng: np.random.Generator,
+    state: GibbsState,
+    trace: Optional[TraceWriter],
+    subset: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> None:
+    if trace is not None:
+        trace.flush()
+    arrays = {"x": state.x, "sigma2": state.sigma2, "w_fcast": state.w_fcast}
+    meta = {
+        "kind": "gibbs",
+        "iteration": state.iteration,
+        "rng": rng_state(rng),
+        "trace_cursor": None if trace is None else trace.cursor,
+        "trace_states": trace is not None and "x" in trace.shapes,
+        "state_subset": None if subset is None else [subset[0].tolist(), subset[1].tolist()],
+        "moments": None,
+    }
+    if state.moments is not None:
+        moment_arrays, meta["moments"] = state.moments.to_arrays()
+        arrays.update(moment_arrays)
+    save_checkpoint(path, arrays, meta)
+
+
+def _run_loop(
+    spec: ModelSpec,
+    rng: np.random.Generator,
+    state: GibbsState,
+    n_iter: int,
+    trace: Optional[TraceWriter],
+    checkpoint_path: Optional[Path],
+    checkpoint_every: int,
+    subset: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> GibbsState:
+    try:
+        while state.iteration < n_iter:
+            state = gibbs_sweep(rng, spec, state)
+            if trace is not None:
+                x = state.x if subset is None else state.x[np.ix_(*subset)]
+                rows = {"sigma2": state.sigma2, "w_fcast": state.w_fcast, "x": x}
+                trace.append(**{name: rows[name] for name in trace.shapes})
+            if checkpoint_path is not None and (state.iteration % checkpoint_every == 0 or state.iteration == n_iter):
+                save_gibbs_checkpoint(checkpoint_path, rng, state, trace, subset)
+    finally:
+        if trace is not None:
+            trace.close()
+    return state
+
+
+def run_gibbs(
+    spec: ModelSpec,
+    rng: np.random.Generator,
+    n_iter: int,
+    state: Optional[GibbsState] = None,
+    trace_dir: Optional[Path] = None,
+    trace_states: bool = False,
+    checkpoint_path: Optional[Path] = None,
+    checkpoint_every: int = 100,
+    moments: Optional[StateMoments] = None,
+    state_times: Optional[Sequence[int]] = None,
+    state_coords: Optional[Sequence[int]] = None,
+) -> GibbsState:
+    """Run sweeps until `n_iter` total iterations, appending traces and checkpointing periodically.
+
+    Checkpoints hold the current states, sigma^2, W^{(f)}, the bit-generator state, the trace
+    cursor and any moment accumulator, written atomically after the traces are flushed.
+    With `moments`, every sweep past its burn-in updates the accumulator in place (with draws,
+    or with smoothed conditional moments if it is Rao-Blackwellized), which is also returned
+    on `state.moments`. `state_times` / `state_coords` restrict traced states
+    to a subset of times and coordinates.
+    """
+    state = initial_state(spec) if state is None else state
+    if moments is not None:
+        state = replace(state, moments=moments)
+    subset = None
+    if state_times is not None or state_coords is not None:
+        subset = state_subset(spec.t_max, spec.d, state_times, state_coords)
+    trace = None if trace_dir is None else TraceWriter(trace_dir, trace_shapes(spec, trace_states, subset))
+    return _run_loop(spec, rng, state, n_iter, trace, checkpoint_path, checkpoint_every, subset)
+
+
+def resume_gibbs(
+    spec: ModelSpec,
+    checkpoint_path: Path,
+    n_iter: int,
+    trace_dir: Optional[Path] = None,
+    checkpoint_every: int = 100,
+) -> GibbsState:
+    """Continue a checkpointed run; the continuation is bit-identical to an uninterrupted run.
+
+    Trace rows written after the checkpoint (e.g. before a preemption) are truncated and
+    the resumed sweeps are appended from the stored cursor.
+    """
+    arrays, meta = load_checkpoint(checkpoint_path)
+    if meta["kind"] != "gibbs":
+        raise ValueError(f"{checkpoint_path} is a {meta['kind']} checkpoint, not gibbs")
+    rng = restore_rng(meta["rng"])
+    state = GibbsState(
+        iteration=meta["iteration"],
+        x=arrays["x"],
+        sigma2=arrays["sigma2"],
+        w_fcast=arrays["w_fcast"],
+        moments=None if meta.get("moments") is None else StateMoments.from_arrays(arrays, meta["moments"]),
+    )
+    subset = meta.get("state_subset")
+    if subset is not None:
+        subset = state_subset(spec.t_max, spec.d, *subset)
+    trace = None
+    if trace_dir is not None:
+        shapes = trace_shapes(spec, meta["trace_states"], subset)
+        trace = TraceWriter(trace_dir, shapes, cursor=meta["trace_cursor"] or 0)
+    return _run_loop(spec, rng, state, n_iter, trace, checkpoint_path, checkpoint_every, subset)
@@ -3,19 +3,28 @@
 from __future__ import annotations
 
 import math
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from scipy.integrate import quad
 
 from common import ValidationResult
+from quadrature import gaussian_expectation
 
 
 def normal_pdf(x: float, mu: float, var: float) -> float:
     return math.exp(-0.5 * (x - mu) ** 2 / var) / math.sqrt(2.0 * math.pi * var)
 
 
-def run(rng: np.random.Generator, n_cases: int = 10) -> ValidationResult:
+def run(rng: np.random.Generator, n_cases: Optional[int] = None, mode: str = "quad") -> ValidationResult:
+    if mode == "gauss_hermite":
+        # n_cases sets the scalar-state case count; multi-dimensional counts stay fixed.
+        n_scalar = 4000 if n_cases is None else n_cases
+        return run_gauss_hermite(rng, ((1, n_scalar), (2, 1000), (3, 250)))
+    if mode != "quad":
+        raise ValueError(f"Unknown integration mode: {mode}")
+    if n_cases is None:
+        n_cases = 10
     max_rel_err = 0.0
     case_rows: List[Dict[str, float]] = []
 
@@ -68,3 +77,80 @@ def run(rng: np.random.Generator, n_cases: int = 10) -> ValidationResult:
         details=details,
         diagnostics={"max_relative_error": max_rel_err, "cases": case_rows},
     )
+
+
+def random_cases(rng: np.random.Generator, n_cases: int, d: int) -> Dict[str, np.ndarray]:
+    """Random (m, C, h, r, y) cases with a d-dimensional latent state.
+
+    For d == 1 this matches the scalar distributions used by `run`.
+    """
+    m = rng.normal(scale=1.2, size=(n_cases, d))
+    a = rng.normal(scale=0.3 / math.sqrt(d), size=(n_cases, d, d))
+    c_diag = np.exp(rng.normal(loc=-0.3, scale=0.4, size=(n_cases, 1, 1))) / d
+    c = a @ np.swapaxes(a, -1, -2) * (d > 1) + c_diag * np.eye(d)
+    h = rng.normal(loc=1.0, scale=0.3, size=(n_cases, d))
+    r = np.exp(rng.normal(loc=-0.4, scale=0.3, size=n_cases))
+    y = rng.normal(scale=1.0, size=n_cases)
+    return {"m": m, "c": c, "h": h, "r": r, "y": y}
+
+
+def closed_form_marginal(cases: Dict[str, np.ndarray]) -> np.ndarray:
+    h, m, c = cases["h"], cases["m"], cases["c"]
+    mean_cf = np.einsum("ni,ni->n", h, m)
+    var_cf = np.einsum("ni,nij,nj->n", h, c, h) + cases["r"]
+    return np.exp(-0.5 * (cases["y"] - mean_cf) ** 2 / var_cf) / np.sqrt(2.0 * np.pi * var_cf)
+
+
+def numerical_marginal(cases: Dict[str, np.ndarray], order: int, rtol: float) -> Tuple[np.ndarray, int]:
+    h, r, y = cases["h"], cases["r"], cases["y"]
+
+    def likelihood(x: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        mean = (x @ h[rows, :, None])[..., 0]
+        var = r[rows, None]
+        return np.exp(-0.5 * (y[rows, None] - mean) ** 2 / var) / np.sqrt(2.0 * np.pi * var)
+
+    return gaussian_expectation(likelihood, cases["m"], cases["c"], order=order, rtol=rtol, max_order=4 * order)
+
+
+def run_gauss_hermite(
+    rng: np.random.Generator,
+    n_cases_by_dim: Tuple[Tuple[int, int], ...] = ((1, 4000), (2, 1000), (3, 250)),
+) -> ValidationResult:
+    # Tensor rules grow as order^d, so the per-dimension order shrinks as d grows.
+    orders = {1: 32, 2: 24, 3: 16}
+    tolerances = {1: 1e-9, 2: 1e-7, 3: 1e-7}
+    passed = True
+    by_dim: List[Dict[str, float]] = []
+    for d, n_cases in n_cases_by_dim:
+        cases = random_cases(rng, n_cases, d)
+        num, unresolved = numerical_marginal(cases, orders.get(d, 12), rtol=0.1 * tolerances.get(d, 1e-7))
+        den = closed_form_marginal(cases)
+        rel_err = np.abs(num - den) / np.maximum(1e-12, np.abs(den))
+        max_rel = float(np.max(rel_err))
+        passed = passed and max_rel < tolerances.get(d, 1e-7)
+        by_dim.append(
+            {
+                "d": float(d),
+                "n_cases": float(n_cases),
+                "order": float(orders.get(d, 12)),
+                "max_relative_error": max_rel,
+                "unresolved_after_refinement": float(unresolved),
+            }
+        )
+
+    details = (
+        "Joint-to-marginal Gaussian consistency failed (Gauss-Hermite mode)"
+        if not passed
+        else "Tensor Gauss-Hermite integration of the latent-state joint recovers the closed-form marginal for all randomized cases."
+    )
+
+    return ValidationResult(
+        name="joint_marginal_gaussian_consistency_gauss_hermite",
+        passed=passed,
+        equation_refs="docs/derivations/sections/02_joint_density.tex:eq:joint_A,eq:joint_B,eq:joint_C",
+        details=details,
+        diagnostics={
+            "max_relative_error": max(row["max_relative_error"] for row in by_dim),
+            "by_dimension": by_dim,
+        },
+    )
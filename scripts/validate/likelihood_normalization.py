@@ -3,19 +3,30 @@
 from __future__ import annotations
 
 import math
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import numpy as np
 from scipy.integrate import quad
 
 from common import ValidationResult
+from quadrature import integrate_real_line
 
 
 def normal_pdf(y: float, mu: float, sigma2: float) -> float:
     return math.exp(-0.5 * (y - mu) ** 2 / sigma2) / math.sqrt(2.0 * math.pi * sigma2)
 
 
-def run(rng: np.random.Generator, n_cases: int = 12) -> ValidationResult:
+def normal_pdf_array(y: np.ndarray, mu: np.ndarray, sigma2: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * (y - mu) ** 2 / sigma2) / np.sqrt(2.0 * np.pi * sigma2)
+
+
+def run(rng: np.random.Generator, n_cases: Optional[int] = None, mode: str = "quad") -> ValidationResult:
+    if mode == "gauss_hermite":
+        return run_gauss_hermite(rng, 5000 if n_cases is None else n_cases)
+    if mode != "quad":
+        raise ValueError(f"Unknown integration mode: {mode}")
+    if n_cases is None:
+        n_cases = 12
     max_abs_err = 0.0
     case_rows: List[Dict[str, float]] = []
     for _ in range(n_cases):
@@ -40,3 +51,46 @@ def run(rng: np.random.Generator, n_cases: int = 12) -> ValidationResult:
         details=details,
         diagnostics={"max_abs_error": max_abs_err, "cases": case_rows},
     )
+
+
+def run_gauss_hermite(rng: np.random.Generator, n_cases: int = 5000, order: int = 64) -> ValidationResult:
+    mu = rng.normal(loc=0.0, scale=2.0, size=n_cases)
+    sigma2 = np.exp(rng.normal(loc=-0.2, scale=0.7, size=n_cases))
+    # Deliberately mismatched rule location/scale so the check does not reduce to sum(weights).
+    loc = mu + 0.3 * np.sqrt(sigma2) * rng.normal(size=n_cases)
+    scale = np.sqrt(sigma2) * np.exp(0.1 * rng.normal(size=n_cases))
+
+    integral, n_fallback = integrate_real_line(
+        lambda y, rows: normal_pdf_array(y, mu[rows, None], sigma2[rows, None]),
+        loc,
+        scale,
+        order=order,
+    )
+    abs_err = np.abs(integral - 1.0)
+    max_abs_err = float(np.max(abs_err))
+    worst = np.argsort(abs_err)[-5:][::-1]
+    case_rows: List[Dict[str, float]] = [
+        {"mu": float(mu[i]), "sigma2": float(sigma2[i]), "integral": float(integral[i]), "abs_err": float(abs_err[i])}
+        for i in worst
+    ]
+
+    passed = max_abs_err < 1e-9
+    details = (
+        "Gaussian likelihood normalization over support R failed (Gauss-Hermite mode)"
+        if not passed
+        else f"All {n_cases} randomized Gaussian likelihoods integrated to 1 within tolerance (Gauss-Hermite mode)."
+    )
+
+    return ValidationResult(
+        name="gaussian_likelihood_normalization_gauss_hermite",
+        passed=passed,
+        equation_refs="docs/derivations/sections/01_notation_and_model.tex:eq:A_obs,eq:B_obs,eq:C_obs",
+        details=details,
+        diagnostics={
+            "max_abs_error": max_abs_err,
+            "n_cases": float(n_cases),
+            "order": float(order),
+            "adaptive_fallbacks": float(n_fallback),
+            "worst_cases": case_rows,
+        },
+    )
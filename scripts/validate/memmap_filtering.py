@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import tempfile
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from common import ValidationResult
+from kalman_bruteforce import brute_force_posterior, simulate_system
+from state_space import (
+    MemmapFilterStore,
+    ObservationList,
+    ffbs_sample,
+    kalman_filter,
+    rts_smoother,
+)
+
+# Toy system shared with kalman_bruteforce.
+G = np.array([[0.9, 0.1], [0.0, 0.8]])
+Q = np.array([[0.15, 0.02], [0.02, 0.1]])
+H = [np.array([1.0, -0.3]), np.array([0.2, 1.1])]
+R = [0.3, 0.45]
+M0 = np.array([0.4, -0.2])
+C0 = np.array([[0.7, 0.1], [0.1, 0.6]])
+
+
+def toy_observations(y: List[List[float]]) -> ObservationList:
+    rows = [(t, n, y[t - 1][n], H[n], R[n], n) for t in range(1, len(y) + 1) for n in range(2)]
+    return ObservationList.from_tuples(rows)
+
+
+def run(rng: np.random.Generator, t_max: int = 9, chunk_size: int = 4) -> ValidationResult:
+    _x_true, y = simulate_system(rng, t_max=t_max, d=2)
+    obs = toy_observations(y)
+    ms_bf, cs_bf = brute_force_posterior(y)
+    seed = int(rng.integers(2**31))
+
+    in_memory = kalman_filter(obs, G, Q, M0, C0, t_max)
+    smoothed = rts_smoother(in_memory.store, G, chunk_size=t_max + 1)
+    draw_mem = ffbs_sample(np.random.default_rng(seed), in_memory.store, G, chunk_size=t_max + 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        disk = kalman_filter(obs, G, Q, M0, C0, t_max, store=MemmapFilterStore(root / "filter", t_max, 2, chunk_size))
+        reopened = MemmapFilterStore.open(root / "filter", mode="r")
+        smoothed_disk = rts_smoother(reopened, G, chunk_size, out=MemmapFilterStore(root / "smooth", t_max, 2, chunk_size))
+        draws = np.memmap(root / "draws.dat", dtype=np.float64, mode="w+", shape=(t_max + 1, 2))
+        ffbs_sample(np.random.default_rng(seed), reopened, G, chunk_size, out=draws)
+
+        store_diff = max(
+            float(np.max(np.abs(np.asarray(getattr(reopened, k)) - getattr(in_memory.store, k))))
+            for k in MemmapFilterStore.FILES
+        )
+        smooth_diff = max(
+            float(np.max(np.abs(np.asarray(smoothed_disk.m) - smoothed.m))),
+            float(np.max(np.abs(np.asarray(smoothed_disk.c) - smoothed.c))),
+        )
+        draw_diff = float(np.max(np.abs(np.asarray(draws) - draw_mem)))
+        loglik_diff = abs(disk.loglik - in_memory.loglik)
+
+    max_mean_err = max(float(np.max(np.abs(smoothed.m[t] - ms_bf[t]))) for t in range(t_max + 1))
+    max_cov_err = max(float(np.max(np.abs(smoothed.c[t] - cs_bf[t]))) for t in range(t_max + 1))
+
+    passed = max_mean_err < 1e-8 and max_cov_err < 1e-8 and max(store_diff, smooth_diff, draw_diff, loglik_diff) == 0.0
+    details = (
+        "Memory-mapped filter/smoother/FFBS outputs differ from the in-memory or brute-force results"
+        if not passed
+        else "Chunked memmap filter storage with reverse-streamed RTS/FFBS reproduces in-memory and brute-force results."
+    )
+
+    return ValidationResult(
+        name="memmap_filter_streaming_backward_pass",
+        passed=passed,
+        equation_refs=(
+            "docs/derivations/sections/03_state_posterior_ffbs.tex:"
+            "eq:kf_f,eq:kf_K,eq:kf_m,eq:kf_C,eq:ffbs_B,eq:ffbs_b,eq:ffbs_H,eq:ffbs_cond"
+        ),
+        details=details,
+        diagnostics={
+            "t_max": float(t_max),
+            "chunk_size": float(chunk_size),
+            "max_abs_mean_error_vs_bruteforce": max_mean_err,
+            "max_abs_cov_error_vs_bruteforce": max_cov_err,
+            "max_abs_store_difference": store_diff,
+            "max_abs_smoother_difference": smooth_diff,
+            "max_abs_ffbs_draw_difference": draw_diff,
+        },
+    )
@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 
 SECTION_RE = re.compile(r"^\\section\{(.+?)\}", re.MULTILINE)
@@ -16,20 +19,45 @@ ENV_RE = re.compile(
     re.DOTALL,
 )
 LABEL_RE = re.compile(r"\\label\{([^}]+)\}")
+ROW_SPLIT_RE = re.compile(r"\\\\")
+# One pass covering the former chained replacements: \given -> \mid; drop \!, \;, the
+# \big/\Big prefixes (which also strips \bigg/\Bigg down to "g", as before) and whitespace.
+CANON_RE = re.compile(r"\\given|\\[!;]|\\[bB]ig|\s+")
+
+INDEX_VERSION = 1
+
+
+@dataclass
+class DocumentIndex:
+    sha256: str
+    sections: List[str]
+    subsections: List[str]
+    equations: Dict[str, str]
+
+    def to_json(self) -> dict:
+        return {
+            "sha256": self.sha256,
+            "sections": self.sections,
+            "subsections": self.subsections,
+            "equations": self.equations,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "DocumentIndex":
+        return cls(
+            sha256=data["sha256"],
+            sections=list(data["sections"]),
+            subsections=list(data["subsections"]),
+            equations=dict(data["equations"]),
+        )
+
+
+def _canon_token(match: "re.Match[str]") -> str:
+    return "\\mid" if match.group(0) == "\\given" else ""
 
 
 def canonicalize(tex: str) -> str:
-    out = tex
-    out = out.replace("\\given", "\\mid")
-    out = out.replace("\\!", "")
-    out = out.replace("\\;", "")
-    out = out.replace("\\big", "")
-    out = out.replace("\\Big", "")
-    out = out.replace("\\bigg", "")
-    out = out.replace("\\Bigg", "")
-    out = re.sub(r"\s+", "", out)
-    out = out.replace("\n", "")
-    return out
+    return CANON_RE.sub(_canon_token, tex)
 
 
 def read_tex(path: Path) -> str:
@@ -47,8 +75,9 @@ def collect_subsections(tex: str) -> List[str]:
 def labeled_equations(tex: str) -> Dict[str, str]:
     out: Dict[str, str] = {}
     for _env, body in ENV_RE.findall(tex):
-        parts = re.split(r"\\\\", body)
-        for part in parts:
+        if "\\label" not in body:
+            continue
+        for part in ROW_SPLIT_RE.split(body):
             labels = LABEL_RE.findall(part)
             if not labels:
                 continue
@@ -58,20 +87,93 @@ def labeled_equations(tex: str) -> Dict[str, str]:
     return out
 
 
-def run_parity(reference_main: Path, ndlm_sections_root: Path) -> Dict[str, object]:
-    ref_tex = read_tex(reference_main)
-    ndlm_tex_parts: List[str] = []
-    for path in sorted(ndlm_sections_root.glob("*.tex")):
-        ndlm_tex_parts.append(read_tex(path))
-    ndlm_tex = "\n".join(ndlm_tex_parts)
+def index_document(path: Path) -> DocumentIndex:
+    raw = path.read_bytes()
+    tex = raw.decode("utf-8")
+    return DocumentIndex(
+        sha256=hashlib.sha256(raw).hexdigest(),
+        sections=collect_sections(tex),
+        subsections=collect_subsections(tex),
+        equations=labeled_equations(tex),
+    )
+
+
+def load_parity_index(index_path: Optional[Path]) -> Dict[str, DocumentIndex]:
+    if index_path is None or not index_path.exists():
+        return {}
+    try:
+        data = json.loads(index_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+        return {}
+    return {path: DocumentIndex.from_json(entry) for path, entry in data.get("documents", {}).items()}
+
+
+def write_parity_index(index_path: Path, documents: Dict[str, DocumentIndex]) -> None:
+    payload = {
+        "version": INDEX_VERSION,
+        "documents": {path: doc.to_json() for path, doc in sorted(documents.items())},
+    }
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_suffix(index_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(payload, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(index_path)
+
+
+def build_index(
+    paths: Sequence[Path],
+    index_path: Optional[Path] = None,
+    max_workers: Optional[int] = None,
+) -> Tuple[Dict[str, DocumentIndex], int]:
+    """Index every document, reusing on-disk entries whose content hash is unchanged.
+
+    Stale documents are parsed in a process pool when there is more than one of them.
+    Entries for documents not in `paths` are kept so several runs can share one index file.
+    Returns the index keyed by resolved path and the number of documents re-parsed.
+    """
+    documents = load_parity_index(index_path)
+    stale: List[Path] = []
+    for path in dict.fromkeys(p.resolve() for p in paths):
+        key = str(path)
+        doc = documents.get(key)
+        if doc is None or doc.sha256 != hashlib.sha256(path.read_bytes()).hexdigest():
+            stale.append(path)
+
+    if len(stale) > 1 and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            fresh = list(pool.map(index_document, stale))
+    else:
+        fresh = [index_document(path) for path in stale]
+    for path, doc in zip(stale, fresh):
+        documents[str(path)] = doc
+
+    if index_path is not None and stale:
+        write_parity_index(index_path, documents)
+    return documents, len(stale)
+
 
-    ref_sections = collect_sections(ref_tex)
-    ndlm_sections = collect_sections(ndlm_tex)
-    ref_headings = ref_sections + collect_subsections(ref_tex)
-    ndlm_headings = ndlm_sections + collect_subsections(ndlm_tex)
+def merge_documents(docs: Sequence[DocumentIndex]) -> DocumentIndex:
+    """Combine per-file indexes in order; later labels win, as in a concatenated parse."""
+    merged = DocumentIndex(sha256="", sections=[], subsections=[], equations={})
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.sha256.encode("ascii"))
+        merged.sections.extend(doc.sections)
+        merged.subsections.extend(doc.subsections)
+        merged.equations.update(doc.equations)
+    merged.sha256 = digest.hexdigest()
+    return merged
 
-    ref_eq = labeled_equations(ref_tex)
-    ndlm_eq = labeled_equations(ndlm_tex)
+
+def compare_documents(ref: DocumentIndex, ndlm: DocumentIndex) -> Dict[str, object]:
+    ref_sections = ref.sections
+    ndlm_sections = ndlm.sections
+    ref_headings = ref_sections + ref.subsections
+    ndlm_headings = ndlm_sections + ndlm.subsections
+
+    ref_eq = ref.equations
+    ndlm_eq = ndlm.equations
 
     shared_labels = ["eq:A_theta", "eq:A_zeta", "eq:A_psi", "eq:B_delta"]
     expected_different_labels = ["eq:A_obs", "eq:B_obs", "eq:C_obs"]
@@ -134,25 +236,59 @@ def run_parity(reference_main: Path, ndlm_sections_root: Path) -> Dict[str, obje
     }
 
 
-def write_markdown(report: Dict[str, object], output_path: Path) -> None:
+def run_parity(
+    reference_main: Path,
+    ndlm_sections_root: Path,
+    index_path: Optional[Path] = None,
+) -> Dict[str, object]:
+    return run_parity_many([reference_main], ndlm_sections_root, index_path, max_workers=1)["references"][
+        str(reference_main)
+    ]
+
+
+def run_parity_many(
+    reference_mains: Sequence[Path],
+    ndlm_sections_root: Path,
+    index_path: Optional[Path] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, object]:
+    """Compare the NDLM sections against every reference `main.tex`, indexing all documents once."""
+    ndlm_paths = sorted(ndlm_sections_root.glob("*.tex"))
+    documents, reindexed = build_index(list(reference_mains) + ndlm_paths, index_path, max_workers)
+    ndlm = merge_documents([documents[str(path.resolve())] for path in ndlm_paths])
+
+    reports: Dict[str, Dict[str, object]] = {}
+    for reference_main in reference_mains:
+        reports[str(reference_main)] = compare_documents(documents[str(reference_main.resolve())], ndlm)
+    all_pass = all(report["status"] == "PASS" for report in reports.values())
+    return {
+        "references": reports,
+        "documents_reindexed": reindexed,
+        "status": "PASS" if all_pass else "FAIL",
+    }
+
+
+def markdown_lines(report: Dict[str, object], title: str = "Parity With exDQLM", level: int = 1) -> List[str]:
+    h1 = "#" * level
+    h2 = "#" * (level + 1)
     lines: List[str] = []
-    lines.append("# Parity With exDQLM")
+    lines.append(f"{h1} {title}")
     lines.append("")
-    lines.append("## Summary")
+    lines.append(f"{h2} Summary")
     lines.append("")
     lines.append(f"- Status: {report['status']}")
     lines.append(f"- exDQLM sections: {report['ref_sections_count']}")
     lines.append(f"- NDLM sections: {report['ndlm_sections_count']}")
     lines.append("")
 
-    lines.append("## Matched section themes")
+    lines.append(f"{h2} Matched section themes")
     lines.append("")
     for row in report["section_keyword_matches"]:  # type: ignore[index]
         mark = "YES" if row["matched"] else "NO"
         lines.append(f"- {row['keyword']}: {mark}")
     lines.append("")
 
-    lines.append("## Equation labels expected to match")
+    lines.append(f"{h2} Equation labels expected to match")
     lines.append("")
     for label in report["shared_equation_labels_matched"]:  # type: ignore[index]
         lines.append(f"- {label}: matched")
@@ -161,7 +297,7 @@ def write_markdown(report: Dict[str, object], output_path: Path) -> None:
         lines.append(f"- {label}: mismatch or missing")
     lines.append("")
 
-    lines.append("## Expected likelihood differences")
+    lines.append(f"{h2} Expected likelihood differences")
     lines.append("")
     for label in report["expected_likelihood_difference_confirmed"]:  # type: ignore[index]
         lines.append(f"- {label}: confirmed different (expected)")
@@ -170,7 +306,7 @@ def write_markdown(report: Dict[str, object], output_path: Path) -> None:
         lines.append(f"- {label}: not confirmed (unexpected)")
     lines.append("")
 
-    lines.append("## Unexpected differences")
+    lines.append(f"{h2} Unexpected differences")
     lines.append("")
     unexpected = report["unexpected_differences"]  # type: ignore[index]
     if unexpected:
@@ -178,6 +314,24 @@ def write_markdown(report: Dict[str, object], output_path: Path) -> None:
             lines.append(f"- {item}")
     else:
         lines.append("- None")
+    return lines
+
+
+def write_markdown(report: Dict[str, object], output_path: Path) -> None:
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text("\n".join(markdown_lines(report)), encoding="utf-8")
+
+
+def write_markdown_many(report: Dict[str, object], output_path: Path) -> None:
+    lines: List[str] = []
+    lines.append("# Parity With Reference Repos")
+    lines.append("")
+    lines.append(f"- Status: {report['status']}")
+    lines.append(f"- References: {len(report['references'])}")  # type: ignore[arg-type]
+    lines.append(f"- Documents re-indexed: {report['documents_reindexed']}")
+    for reference, ref_report in report["references"].items():  # type: ignore[union-attr]
+        lines.append("")
+        lines.extend(markdown_lines(ref_report, title=f"Parity With {Path(reference).parent.name}", level=2))
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_path.write_text("\n".join(lines), encoding="utf-8")
@@ -185,17 +339,34 @@ def write_markdown(report: Dict[str, object], output_path: Path) -> None:
 
 def main() -> None:
     parser = argparse.ArgumentParser()
-    parser.add_argument("--reference-main", type=Path, required=True)
+    parser.add_argument(
+        "--reference-main",
+        type=Path,
+        action="append",
+        required=True,
+        help="Reference main.tex (repeatable to compare against several repos).",
+    )
     parser.add_argument("--ndlm-sections-root", type=Path, required=True)
     parser.add_argument("--json-output", type=Path, required=True)
     parser.add_argument("--md-output", type=Path, required=True)
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=None,
+        help="On-disk labeled-equation index; documents with unchanged content hash are not re-parsed.",
+    )
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for re-indexing.")
     args = parser.parse_args()
 
-    report = run_parity(args.reference_main, args.ndlm_sections_root)
+    if len(args.reference_main) == 1:
+        report = run_parity(args.reference_main[0], args.ndlm_sections_root, args.index)
+        write_markdown(report, args.md_output)
+    else:
+        report = run_parity_many(args.reference_main, args.ndlm_sections_root, args.index, args.jobs)
+        write_markdown_many(report, args.md_output)
 
     args.json_output.parent.mkdir(parents=True, exist_ok=True)
     args.json_output.write_text(json.dumps(report, indent=2, sort_keys=True), encoding="utf-8")
-    write_markdown(report, args.md_output)
 
     print(f"parity status: {report['status']}")
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+from functools import reduce
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from state_space import ObservationList, row_fitted
+
+
+class StateMoments:
+    """Streaming posterior moments of state paths x_{0:T} without storing the draws.
+
+    Welford updates keep the running mean, the centred sums of squares M2 of every x_{t,i}
+    and, for each lag l, the centred cross sums sum_s (x_t - mean_t)(x_{t-l} - mean_{t-l})'
+    for t = l..T. Accumulators from separate chains or workers combine with `merge`
+    (Chan et al. pairwise update), so the result does not depend on how draws were split.
+    Sweeps with iteration <= `burn_in` are skipped by the Gibbs sweep.
+
+    With `rao_blackwell`, each update receives the smoothed conditional moments
+    E[x | sigma^2, W^{(f)}, y], Cov(x_t | .) and Cov(x_t, x_{t-1} | .) instead of a draw. The
+    Welford sums then track the conditional means, running averages track the conditional
+    (lag-one) covariances, and `variance` / `lag_covariance` return their sum by the law of
+    total variance. Only lag one is available in this mode.
+    """
+
+    def __init__(
+        self, t_max: int, d: int, lags: Sequence[int] = (1,), burn_in: int = 0, rao_blackwell: bool = False
+    ) -> None:
+        if any(lag < 1 or lag > t_max for lag in lags):
+            raise ValueError(f"Lags must lie in 1..{t_max}, got {tuple(lags)}")
+        if rao_blackwell and any(lag != 1 for lag in lags):
+            raise ValueError(f"Rao-Blackwellized moments support lag 1 only, got {tuple(lags)}")
+        self.lags = tuple(int(lag) for lag in lags)
+        self.burn_in = int(burn_in)
+        self.rao_blackwell = bool(rao_blackwell)
+        self.count = 0
+        self.mean = np.zeros((t_max + 1, d))
+        self.m2 = np.zeros((t_max + 1, d))
+        self.cross = {lag: np.zeros((t_max + 1 - lag, d, d)) for lag in self.lags}
+        self.cond_var: Optional[np.ndarray] = None
+        self.cond_cross: Dict[int, np.ndarray] = {}
+        if self.rao_blackwell:
+            self.cond_var = np.zeros((t_max + 1, d))
+            self.cond_cross = {lag: np.zeros_like(c) for lag, c in self.cross.items()}
+
+    def update(self, x: np.ndarray, cov: Optional[np.ndarray] = None, cross: Optional[np.ndarray] = None) -> None:
+        """Add a draw x_{0:T}, or in Rao-Blackwell mode the smoothed mean with its (T + 1, d, d)
+        covariances `cov` and the smoother's lag-one `cross` (needed only when lag 1 is tracked)."""
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        after = x - self.mean
+        self.m2 += delta * after
+        for lag, c in self.cross.items():
+            c += delta[lag:, :, None] * after[:-lag, None, :]
+        if self.rao_blackwell:
+            self.cond_var += (np.diagonal(cov, axis1=1, axis2=2) - self.cond_var) / self.count
+            for lag, c in self.cond_cross.items():
+                c += (cross[lag:] - c) / self.count
+
+    def merge(self, other: StateMoments) -> StateMoments:
+        """Pooled moments of both draw sets; neither input is modified."""
+        if self.lags != other.lags or self.mean.shape != other.mean.shape:
+            raise ValueError("Cannot merge state moments with different shapes or lags")
+        if self.rao_blackwell != other.rao_blackwell:
+            raise ValueError("Cannot merge Rao-Blackwellized and draw-based state moments")
+        out = StateMoments(self.mean.shape[0] - 1, self.mean.shape[1], self.lags, self.burn_in, self.rao_blackwell)
+        n_a, n_b = self.count, other.count
+        out.count = n_a + n_b
+        if out.count == 0:
+            return out
+        delta = other.mean - self.mean
+        w = n_a * n_b / out.count
+        out.mean = self.mean + delta * (n_b / out.count)
+        out.m2 = self.m2 + other.m2 + w * delta * delta
+        for lag in self.lags:
+            out.cross[lag] = self.cross[lag] + other.cross[lag] + w * delta[lag:, :, None] * delta[:-lag, None, :]
+        if self.rao_blackwell:
+            out.cond_var = (n_a * self.cond_var + n_b * other.cond_var) / out.count
+            for lag in self.lags:
+                out.cond_cross[lag] = (n_a * self.cond_cross[lag] + n_b * other.cond_cross[lag]) / out.count
+        return out
+
+    def variance(self) -> np.ndarray:
+        """(T + 1, d) posterior variances Var(x_{t,i}) with the 1 / (S - 1) normalization."""
+        var = self.m2 / max(self.count - 1, 1)
+        return var if self.cond_var is None else var + self.cond_var
+
+    def lag_covariance(self, lag: int) -> np.ndarray:
+        """(T + 1 - lag, d, d) posterior covariances Cov(x_t, x_{t-lag}), t = lag..T."""
+        cov = self.cross[lag] / max(self.count - 1, 1)
+        return cov + self.cond_cross[lag] if self.rao_blackwell else cov
+
+    def to_arrays(self, prefix: str = "moments_") -> Tuple[Dict[str, np.ndarray], dict]:
+        arrays = {f"{prefix}mean": self.mean, f"{prefix}m2": self.m2}
+        arrays.update({f"{prefix}cross_{lag}": c for lag, c in self.cross.items()})
+        if self.rao_blackwell:
+            arrays[f"{prefix}cond_var"] = self.cond_var
+            arrays.update({f"{prefix}cond_cross_{lag}": c for lag, c in self.cond_cross.items()})
+        meta = {"count": self.count, "lags": list(self.lags), "burn_in": self.burn_in, "rao_blackwell": self.rao_blackwell}
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], meta: dict, prefix: str = "moments_") -> StateMoments:
+        mean = arrays[f"{prefix}mean"]
+        out = cls(mean.shape[0] - 1, mean.shape[1], meta["lags"], meta["burn_in"], meta.get("rao_blackwell", False))
+        out.count = int(meta["count"])
+        out.mean = np.array(mean, dtype=float)
+        out.m2 = np.array(arrays[f"{prefix}m2"], dtype=float)
+        out.cross = {lag: np.array(arrays[f"{prefix}cross_{lag}"], dtype=float) for lag in out.lags}
+        if out.rao_blackwell:
+            out.cond_var = np.array(arrays[f"{prefix}cond_var"], dtype=float)
+            out.cond_cross = {lag: np.array(arrays[f"{prefix}cond_cross_{lag}"], dtype=float) for lag in out.lags}
+        return out
+
+
+def merge_moments(parts: Iterable[StateMoments]) -> StateMoments:
+    """Pool accumulators from several chains or workers."""
+    return reduce(StateMoments.merge, parts)
+
+
+def predictive_means(obs: ObservationList, moments: StateMoments) -> np.ndarray:
+    """Posterior means of h_{t,n}' x_t for every row, from the accumulated state means."""
+    return row_fitted(obs, moments.mean)
+
+
+def synthesized_target(loadings: np.ndarray, moments: StateMoments, t_hist: int) -> np.ndarray:
+    """(K,) posterior means of mu_{T+k}^{0,syn} = f_k' x_{T+k} (eq:target_syn_red) for loadings (K, d)."""
+    loadings = np.asarray(loadings, dtype=float)
+    return np.einsum("kd,kd->k", loadings, moments.mean[t_hist + 1 : t_hist + 1 + loadings.shape[0]])
+
+
+def state_subset(
+    t_max: int, d: int, times: Optional[Sequence[int]] = None, coords: Optional[Sequence[int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Validated (times, coords) index arrays for retained draws; None keeps every time or coordinate."""
+    t_idx = np.arange(t_max + 1) if times is None else np.asarray(times, dtype=int)
+    c_idx = np.arange(d) if coords is None else np.asarray(coords, dtype=int)
+    if t_idx.size == 0 or c_idx.size == 0:
+        raise ValueError("Retained state subset must be non-empty")
+    if t_idx.min() < 0 or t_idx.max() > t_max or c_idx.min() < 0 or c_idx.max() >= d:
+        raise ValueError(f"Retained state subset lies outside times 0..{t_max} or coordinates 0..{d - 1}")
+    return t_idx, c_idx
@@ -0,0 +1,650 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import json
+import math
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Iterator, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+
+LOG_2PI = math.log(2.0 * math.pi)
+VARIANCE_FLOOR = 1e-12
+
+
+@dataclass
+class ObservationList:
+    """Columnar observation-list API: one row per tuple (t, n, y_{t,n}, h_{t,n}, r_{t,n}, source(n)).
+
+    Rows are kept sorted by (t, n) so the observations at time t are the contiguous
+    slice offsets[t]:offsets[t + 1] returned by `time_offsets`.
+
+    Designs are dense (n_obs, d) by default. For selector-like designs pass `h_index`
+    (n_obs, k) with `h` holding the matching (n_obs, k) values and the state dimension `d`;
+    rows with fewer non-zeros are padded with (index 0, value 0).
+
+    Rows aggregated from I replicates (eq:replicate_sufficient) may carry `count` = I and
+    `within` = sum_i (y_i - ybar)^2 / s, the within-SSE in units of the per-replicate scale
+    s = I r (eq:sse_decomposition); see `from_replicates`.
+    """
+
+    t: np.ndarray
+    n: np.ndarray
+    y: np.ndarray
+    h: np.ndarray
+    r: np.ndarray
+    source: np.ndarray
+    h_index: Optional[np.ndarray] = None
+    d: Optional[int] = None
+    count: Optional[np.ndarray] = None
+    within: Optional[np.ndarray] = None
+
+    def __post_init__(self) -> None:
+        self.t = np.asarray(self.t, dtype=np.int64)
+        self.n = np.asarray(self.n, dtype=np.int64)
+        self.y = np.asarray(self.y, dtype=float)
+        self.h = np.atleast_2d(np.asarray(self.h, dtype=float))
+        self.r = np.asarray(self.r, dtype=float)
+        self.source = np.asarray(self.source, dtype=np.int64)
+        columns = ["t", "n", "y", "h", "r", "source"]
+        if self.h_index is not None:
+            self.h_index = np.atleast_2d(np.asarray(self.h_index, dtype=np.int64))
+            if self.d is None:
+                raise ValueError("Sparse observation designs need the state dimension d")
+            columns.append("h_index")
+        if (self.count is None) != (self.within is None):
+            raise ValueError("Replicate counts and within-SSE must be given together")
+        if self.count is not None:
+            self.count = np.asarray(self.count, dtype=float)
+            self.within = np.asarray(self.within, dtype=float)
+            columns += ["count", "within"]
+        order = np.lexsort((self.n, self.t))
+        if np.any(order != np.arange(order.size)):
+            for name in columns:
+                setattr(self, name, getattr(self, name)[order])
+
+    @classmethod
+    def from_tuples(cls, rows: Sequence[Tuple[int, int, float, np.ndarray, float, int]]) -> "ObservationList":
+        t, n, y, h, r, source = zip(*rows)
+        return cls(t=np.array(t), n=np.array(n), y=np.array(y), h=np.stack(h), r=np.array(r), source=np.array(source))
+
+    @classmethod
+    def from_sparse_tuples(
+        cls,
+        rows: Sequence[Tuple[int, int, float, Tuple[np.ndarray, np.ndarray], float, int]],
+        d: int,
+    ) -> "ObservationList":
+        """Rows whose design is an (indices, values) pair, e.g. the theta and delta^j blocks of eq:B_obs."""
+        t, n, y, h, r, source = zip(*rows)
+        width = max(len(idx) for idx, _values in h)
+        h_index = np.zeros((len(rows), width), dtype=np.int64)
+        h_value = np.zeros((len(rows), width))
+        for i, (idx, values) in enumerate(h):
+            h_index[i, : len(idx)] = idx
+            h_value[i, : len(idx)] = values
+        return cls(
+            t=np.array(t),
+            n=np.array(n),
+            y=np.array(y),
+            h=h_value,
+            r=np.array(r),
+            source=np.array(source),
+            h_index=h_index,
+            d=d,
+        )
+
+    @classmethod
+    def from_replicates(
+        cls,
+        t: np.ndarray,
+        n: np.ndarray,
+        y: np.ndarray,
+        h: np.ndarray,
+        scale: np.ndarray,
+        source: np.ndarray,
+    ) -> "ObservationList":
+        """Aggregate raw replicate rows sharing (t, n) into ybar rows with r = s / I (dense designs).
+
+        Replicates of a channel share h, scale s and source; groups are reduced with
+        `np.add.reduceat` after one sort, so no Python loop runs over rows.
+        """
+        t, n, y, scale = np.asarray(t), np.asarray(n), np.asarray(y, dtype=float), np.asarray(scale, dtype=float)
+        order = np.lexsort((n, t))
+        t, n, y, scale = t[order], n[order], y[order], scale[order]
+        new_group = np.ones(t.size, dtype=bool)
+        new_group[1:] = (t[1:] != t[:-1]) | (n[1:] != n[:-1])
+        starts = np.flatnonzero(new_group)
+        count = np.diff(np.append(starts, t.size)).astype(float)
+        ybar = np.add.reduceat(y, starts) / count
+        within = np.add.reduceat((y - np.repeat(ybar, count.astype(np.int64))) ** 2, starts) / scale[starts]
+        first = order[starts]
+        return cls(
+            t=t[starts],
+            n=n[starts],
+            y=ybar,
+            h=np.atleast_2d(np.asarray(h, dtype=float))[first],
+            r=scale[starts] / count,
+            source=np.asarray(source)[first],
+            count=count,
+            within=within,
+        )
+
+    @classmethod
+    def concatenate(cls, parts: Sequence["ObservationList"]) -> "ObservationList":
+        """Stack row sets (re-sorted by (t, n)); optional columns must be present in all or none."""
+        names = ["t", "n", "y", "h", "r", "source", "h_index", "count", "within"]
+        columns = {}
+        for name in names:
+            values = [getattr(p, name) for p in parts]
+            columns[name] = None if values[0] is None else np.concatenate(values)
+        return cls(**columns, d=parts[0].d)
+
+    def __len__(self) -> int:
+        return int(self.y.shape[0])
+
+    @property
+    def dim(self) -> int:
+        return int(self.h.shape[1]) if self.d is None else int(self.d)
+
+    @property
+    def is_sparse(self) -> bool:
+        return self.h_index is not None
+
+    def row(self, i: int) -> Tuple[object, np.ndarray]:
+        """(coordinates, values) of h_{t,n}: `values @ x[coords]` is h'x for dense and sparse rows."""
+        if self.h_index is None:
+            return slice(None), self.h[i]
+        return self.h_index[i], self.h[i]
+
+    def select(self, keep: np.ndarray) -> "ObservationList":
+        """Rows where the boolean mask `keep` holds (order is preserved)."""
+        return ObservationList(
+            t=self.t[keep],
+            n=self.n[keep],
+            y=self.y[keep],
+            h=self.h[keep],
+            r=self.r[keep],
+            source=self.source[keep],
+            h_index=None if self.h_index is None else self.h_index[keep],
+            d=self.d,
+            count=None if self.count is None else self.count[keep],
+            within=None if self.within is None else self.within[keep],
+        )
+
+    def time_window(self, t_lo: int, t_hi: int, shift: int = 0) -> "ObservationList":
+        """Rows with t_lo <= t <= t_hi, re-timed to t - shift; found by bisection, not a full scan."""
+        i0, i1 = np.searchsorted(self.t, [t_lo, t_hi + 1], side="left")
+        return ObservationList(
+            t=self.t[i0:i1] - shift,
+            n=self.n[i0:i1],
+            y=self.y[i0:i1],
+            h=self.h[i0:i1],
+            r=self.r[i0:i1],
+            source=self.source[i0:i1],
+            h_index=None if self.h_index is None else self.h_index[i0:i1],
+            d=self.d,
+            count=None if self.count is None else self.count[i0:i1],
+            within=None if self.within is None else self.within[i0:i1],
+        )
+
+    def dense_h(self) -> np.ndarray:
+        if self.h_index is None:
+            return self.h
+        out = np.zeros((len(self), self.dim))
+        np.add.at(out, (np.arange(len(self))[:, None], self.h_index), self.h)
+        return out
+
+    def time_offsets(self, t_max: int) -> np.ndarray:
+        """offsets[t]:offsets[t + 1] indexes the rows observed at time t, for t = 0..t_max."""
+        return np.searchsorted(self.t, np.arange(t_max + 2), side="left")
+
+    def replicate_counts(self) -> np.ndarray:
+        """I per row (ones for rows without replicate statistics)."""
+        return np.ones(len(self)) if self.count is None else self.count
+
+
+def row_fitted(obs: ObservationList, x: np.ndarray) -> np.ndarray:
+    """h_{t,n}' x_t for every row with one batched gather; `x` is (t_max + 1, d)."""
+    if obs.h_index is None:
+        return np.einsum("nd,nd->n", obs.h, x[obs.t])
+    return np.einsum("nk,nk->n", obs.h, x[obs.t[:, None], obs.h_index])
+
+
+def row_quadratic(obs: ObservationList, c: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """h_{t,n}' C_t h_{t,n} for every row, gathering at most `chunk_size` covariances at a time."""
+    out = np.empty(len(obs))
+    for i0 in range(0, len(obs), chunk_size):
+        sl = slice(i0, i0 + chunk_size)
+        t, h = obs.t[sl], obs.h[sl]
+        if obs.h_index is None:
+            block = np.asarray(c[t])
+        else:
+            idx = obs.h_index[sl]
+            block = np.asarray(c[t[:, None, None], idx[:, :, None], idx[:, None, :]])
+        out[sl] = np.einsum("nd,nde,ne->n", h, block, h)
+    return out
+
+
+def source_totals(obs: ObservationList, scaled_sq: np.ndarray, n_sources: int) -> Tuple[np.ndarray, np.ndarray]:
+    """N_j and SSE_j by segment reduction over sources.
+
+    `scaled_sq` holds each row's (E of) (y - h'x)^2 / r. Replicate rows add I to N_j and their
+    within-SSE to SSE_j, completing eq:sse_decomposition.
+    """
+    n = np.bincount(obs.source, weights=obs.replicate_counts(), minlength=n_sources)
+    weights = scaled_sq if obs.within is None else scaled_sq + obs.within
+    return n, np.bincount(obs.source, weights=weights, minlength=n_sources)
+
+
+@dataclass
+class ModelSpec:
+    """Conditionally linear-Gaussian NDLM with unknown source variances and lead covariances.
+
+    `obs.r` holds variance scales, so r_{t,n} = sigma_{source(n)}^2 * obs.r (1 / I_j for
+    aggregated replicates, eq:replicate_sufficient). Times 1..t_hist use the known
+    discount-induced covariances `q_hist[t]`; leads t_hist + k, k = 1..K, use W_{T+k}^{(f)}
+    with IW(nu0[k-1], s0[k-1]) priors. Source variances have IG(a0[j], b0[j]) priors.
+    """
+
+    obs: ObservationList
+    g: np.ndarray
+    q_hist: np.ndarray
+    m0: np.ndarray
+    c0: np.ndarray
+    t_hist: int
+    a0: np.ndarray
+    b0: np.ndarray
+    nu0: np.ndarray
+    s0: np.ndarray
+
+    @property
+    def d(self) -> int:
+        return int(self.m0.shape[0])
+
+    @property
+    def n_sources(self) -> int:
+        return int(self.a0.shape[0])
+
+    @property
+    def n_leads(self) -> int:
+        return int(self.nu0.shape[0])
+
+    @property
+    def t_max(self) -> int:
+        return self.t_hist + self.n_leads
+
+    def with_variances(self, sigma2: np.ndarray) -> ObservationList:
+        """Observation list with r_{t,n} = sigma2[source] * scale filled in."""
+        return replace(self.obs, r=sigma2[self.obs.source] * self.obs.r)
+
+    def transition_covariances(self, w_fcast: np.ndarray) -> np.ndarray:
+        q = np.empty((self.t_max + 1, self.d, self.d))
+        q[: self.t_hist + 1] = self.q_hist[: self.t_hist + 1]
+        q[self.t_hist + 1 :] = w_fcast
+        return q
+
+
+def simulate_model(
+    rng: np.random.Generator,
+    t_hist: int = 20,
+    n_leads: int = 3,
+    d: int = 2,
+    n_sources: int = 2,
+) -> Tuple[ModelSpec, np.ndarray, np.ndarray, np.ndarray]:
+    """Toy spec with discount-like time-varying historical covariances and data drawn from it.
+
+    Returns (spec, x, sigma2, w_fcast) with the true states and parameters.
+    """
+    t_max = t_hist + n_leads
+    g = np.eye(d) + np.diag(np.full(d - 1, 0.1), k=1) if d > 1 else np.eye(1)
+    g = 0.9 * g
+    base = 0.1 * np.eye(d) + 0.02
+    q_hist = base[None] * (1.0 + 0.5 * np.sin(np.arange(t_hist + 1)))[:, None, None]
+    m0 = np.zeros(d)
+    c0 = np.eye(d)
+    nu0 = np.full(n_leads, d + 4.0)
+    s0 = np.repeat(base[None] * (nu0[0] - d - 1.0), n_leads, axis=0)
+    a0 = np.full(n_sources, 3.0)
+    b0 = np.full(n_sources, 1.0)
+
+    sigma2 = 0.2 + 0.3 * rng.uniform(size=n_sources)
+    w_fcast = np.stack([base * rng.uniform(0.5, 1.5) for _ in range(n_leads)])
+    h = rng.normal(size=(n_sources, d))
+
+    x = np.zeros((t_max + 1, d))
+    x[0] = rng.multivariate_normal(m0, c0)
+    q = np.concatenate([q_hist, w_fcast])
+    rows = []
+    for t in range(1, t_max + 1):
+        x[t] = g @ x[t - 1] + rng.multivariate_normal(np.zeros(d), q[t])
+        for j in range(n_sources):
+            n_rep = 1 + (t + j) % 3
+            scale = 1.0 / n_rep
+            y = float(h[j] @ x[t] + rng.normal(scale=math.sqrt(sigma2[j] * scale)))
+            rows.append((t, j, y, h[j], scale, j))
+
+    spec = ModelSpec(
+        obs=ObservationList.from_tuples(rows),
+        g=g,
+        q_hist=q_hist,
+        m0=m0,
+        c0=c0,
+        t_hist=t_hist,
+        a0=a0,
+        b0=b0,
+        nu0=nu0,
+        s0=s0,
+    )
+    return spec, x, sigma2, w_fcast
+
+
+def transition_at(mat: np.ndarray, t: int) -> np.ndarray:
+    """Time-invariant (d, d) matrices are shared; (t_max + 1, d, d) stacks are indexed by t."""
+    return mat if mat.ndim == 2 else mat[t]
+
+
+class FilterStore:
+    """In-memory filter outputs: predicted (a_t, R_t) and filtered (m_t, C_t), t = 0..t_max.
+
+    Index 0 holds the prior (m_0, C_0); a_0 and R_0 are unused zeros.
+    """
+
+    def __init__(self, t_max: int, d: int, dtype: type = np.float64) -> None:
+        self.t_max = t_max
+        self.d = d
+        self.dtype = np.dtype(dtype)
+        self.a = np.zeros((t_max + 1, d), dtype=self.dtype)
+        self.r = np.zeros((t_max + 1, d, d), dtype=self.dtype)
+        self.m = np.zeros((t_max + 1, d), dtype=self.dtype)
+        self.c = np.zeros((t_max + 1, d, d), dtype=self.dtype)
+
+    def write(self, t: int, a: np.ndarray, r: np.ndarray, m: np.ndarray, c: np.ndarray) -> None:
+        self.a[t], self.r[t], self.m[t], self.c[t] = a, r, m, c
+
+    def write_block(self, t0: int, **arrays: np.ndarray) -> None:
+        """Write whole time blocks, e.g. write_block(t0, m=ms, c=cs) from a backward pass."""
+        for name, values in arrays.items():
+            getattr(self, name)[t0 : t0 + values.shape[0]] = values
+
+    def flush(self) -> None:
+        pass
+
+    def read(self, t0: int, t1: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Moments for times t0..t1 - 1 as float64 arrays."""
+        return (
+            np.asarray(self.a[t0:t1], dtype=float),
+            np.asarray(self.r[t0:t1], dtype=float),
+            np.asarray(self.m[t0:t1], dtype=float),
+            np.asarray(self.c[t0:t1], dtype=float),
+        )
+
+    def iter_reverse_chunks(
+        self, chunk_size: int, t_min: int = 0
+    ) -> Iterator[Tuple[int, int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """Yield (t0, t1, a, R, m, C) for [t0, t1) blocks from t_max back to t_min.
+
+        The predicted moments are shifted by one, a[i] = a_{t0 + i + 1}, which is what the
+        backward step at t0 + i needs; for t = t_max they are zeros.
+        """
+        t_end = self.t_max + 1
+        for t1 in range(t_end, t_min, -chunk_size):
+            t0 = max(t_min, t1 - chunk_size)
+            _a, _r, m, c = self.read(t0, t1)
+            a, r, _m, _c = self.read(t0 + 1, min(t1 + 1, t_end))
+            if a.shape[0] < m.shape[0]:
+                a = np.concatenate([a, np.zeros((1, self.d))])
+                r = np.concatenate([r, np.zeros((1, self.d, self.d))])
+            yield t0, t1, a, r, m, c
+
+
+class MemmapFilterStore(FilterStore):
+    """Disk-backed filter outputs in time-major `np.memmap` files under `directory`.
+
+    Writes go through a `chunk_size`-step buffer flushed to disk per chunk and reads map
+    only the requested time range, so resident memory is O(chunk_size * d^2).
+    """
+
+    FILES = ("a", "r", "m", "c")
+
+    def __init__(
+        self,
+        directory: Path,
+        t_max: int,
+        d: int,
+        chunk_size: int = 4096,
+        dtype: type = np.float64,
+        mode: str = "w+",
+    ) -> None:
+        self.t_max = t_max
+        self.d = d
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        shapes = {"a": (t_max + 1, d), "r": (t_max + 1, d, d), "m": (t_max + 1, d), "c": (t_max + 1, d, d)}
+        for name in self.FILES:
+            path = self.directory / f"{name}.dat"
+            setattr(self, name, np.memmap(path, dtype=self.dtype, mode=mode, shape=shapes[name]))
+        if mode == "w+":
+            meta = {"t_max": t_max, "d": d, "chunk_size": chunk_size, "dtype": self.dtype.str}
+            (self.directory / "meta.json").write_text(json.dumps(meta, sort_keys=True), encoding="utf-8")
+        self._buf_start = 0
+        self._buf = {name: np.zeros((chunk_size,) + shapes[name][1:], dtype=self.dtype) for name in self.FILES}
+        self._buf_len = 0
+
+    @classmethod
+    def open(cls, directory: Path, mode: str = "r+") -> "MemmapFilterStore":
+        meta = json.loads((Path(directory) / "meta.json").read_text(encoding="utf-8"))
+        return cls(directory, meta["t_max"], meta["d"], meta["chunk_size"], np.dtype(meta["dtype"]).type, mode=mode)
+
+    def write(self, t: int, a: np.ndarray, r: np.ndarray, m: np.ndarray, c: np.ndarray) -> None:
+        if self._buf_len and t != self._buf_start + self._buf_len:
+            self.flush()
+        if not self._buf_len:
+            self._buf_start = t
+        i = self._buf_len
+        self._buf["a"][i], self._buf["r"][i], self._buf["m"][i], self._buf["c"][i] = a, r, m, c
+        self._buf_len += 1
+        if self._buf_len == self.chunk_size:
+            self.flush()
+
+    def write_block(self, t0: int, **arrays: np.ndarray) -> None:
+        self.flush()
+        super().write_block(t0, **arrays)
+
+    def flush(self) -> None:
+        if self._buf_len:
+            sl = slice(self._buf_start, self._buf_start + self._buf_len)
+            for name in self.FILES:
+                getattr(self, name)[sl] = self._buf[name][: self._buf_len]
+            self._buf_len = 0
+        for name in self.FILES:
+            getattr(self, name).flush()
+
+
+@dataclass
+class FilterResult:
+    store: FilterStore
+    loglik: float
+
+
+def assimilate(
+    m: np.ndarray,
+    c: np.ndarray,
+    y: np.ndarray,
+    h: np.ndarray,
+    r: np.ndarray,
+    h_index: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Sequential scalar updates eq:kf_f--eq:kf_C; returns (m, C, log predictive density).
+
+    With `h_index`, row n of the design is sparse (h_index[n], h[n]) and C h, h'C h and h'm
+    cost O(nnz d) instead of O(d^2); the rank-one covariance update is unchanged.
+    """
+    loglik = 0.0
+    for n in range(y.shape[0]):
+        if h_index is None:
+            ch = c @ h[n]
+            f = max(float(h[n] @ ch) + float(r[n]), VARIANCE_FLOOR)
+            e = float(y[n] - h[n] @ m)
+        else:
+            idx = h_index[n]
+            ch = c[:, idx] @ h[n]
+            f = max(float(h[n] @ ch[idx]) + float(r[n]), VARIANCE_FLOOR)
+            e = float(y[n] - h[n] @ m[idx])
+        k = ch / f
+        m = m + k * e
+        c = c - np.outer(k, ch)
+        c = 0.5 * (c + c.T)
+        loglik -= 0.5 * (LOG_2PI + math.log(f) + e * e / f)
+    return m, c, loglik
+
+
+def kalman_filter(
+    obs: ObservationList,
+    g: np.ndarray,
+    q: np.ndarray,
+    m0: np.ndarray,
+    c0: np.ndarray,
+    t_max: int,
+    store: Optional[FilterStore] = None,
+    t_start: int = 0,
+) -> FilterResult:
+    """Forward pass over t = t_start + 1..t_max writing (a_t, R_t, m_t, C_t) into `store`.
+
+    `g` and `q` are (d, d) or time-indexed (t_max + 1, d, d) stacks (eq:lgssm_state).
+    The log-likelihood is the prediction-error decomposition over all scalar observations.
+    With `t_start > 0`, (m0, c0) are the filtered moments at t_start, rows at or before t_start
+    are skipped and earlier entries of `store` are left untouched.
+    """
+    d = m0.shape[0]
+    store = FilterStore(t_max, d) if store is None else store
+    offsets = obs.time_offsets(t_max)
+    m, c = np.asarray(m0, dtype=float), np.asarray(c0, dtype=float)
+    if t_start == 0:
+        store.write(0, np.zeros(d), np.zeros((d, d)), m, c)
+    loglik = 0.0
+    for t in range(t_start + 1, t_max + 1):
+        g_t = transition_at(g, t)
+        a = g_t @ m
+        r = g_t @ c @ g_t.T + transition_at(q, t)
+        r = 0.5 * (r + r.T)
+        sl = slice(offsets[t], offsets[t + 1])
+        h_index = None if obs.h_index is None else obs.h_index[sl]
+        m, c, ll = assimilate(a, r, obs.y[sl], obs.h[sl], obs.r[sl], h_index)
+        loglik += ll
+        store.write(t, a, r, m, c)
+    store.flush()
+    return FilterResult(store=store, loglik=loglik)
+
+
+def _backward_gain(c: np.ndarray, g_next: np.ndarray, r_next: np.ndarray) -> np.ndarray:
+    """B_t = C_t G_{t+1}' R_{t+1}^{-1} (eq:ffbs_B) via a Cholesky solve."""
+    return cho_solve(cho_factor(r_next), g_next @ c).T
+
+
+def innovation_outer(
+    g_t: np.ndarray,
+    m_t: np.ndarray,
+    c_t: np.ndarray,
+    m_prev: np.ndarray,
+    c_prev: np.ndarray,
+    cross: np.ndarray,
+) -> np.ndarray:
+    """E[u_t u_t'] for u_t = x_t - G_t x_{t-1} from smoothed moments and C*_{t,t-1} (eq:vb_state_moments)."""
+    xx = c_t + np.outer(m_t, m_t)
+    xx_prev = c_prev + np.outer(m_prev, m_prev)
+    x_xprev = cross + np.outer(m_t, m_prev)
+    uu = xx - g_t @ x_xprev.T - x_xprev @ g_t.T + g_t @ xx_prev @ g_t.T
+    return 0.5 * (uu + uu.T)
+
+
+def rts_smoother(
+    store: FilterStore,
+    g: np.ndarray,
+    chunk_size: int = 4096,
+    out: Optional[FilterStore] = None,
+    t_min: int = 0,
+    cross: Optional[np.ndarray] = None,
+    innovation: Optional[np.ndarray] = None,
+) -> FilterStore:
+    """RTS smoother streaming filter moments back in reverse chunks.
+
+    Smoothed means/covariances are written to the (m, C) slots of `out`, which may itself be
+    a `MemmapFilterStore`; only `chunk_size` steps of filter output are resident at a time.
+    The recursion stops at `t_min`, leaving earlier entries of `out` untouched.
+
+    Optional (t_max + 1, d, d) arrays are filled during the same sweep for t_min < t <= t_max:
+    `cross[t]` = C*_{t,t-1} = C*_t B_{t-1}' and `innovation[t]` = E[u_t u_t'].
+    """
+    out = FilterStore(store.t_max, store.d) if out is None else out
+    ms = cs = None
+    for t0, t1, a, r, m, c in store.iter_reverse_chunks(chunk_size, t_min):
+        ms_block, cs_block = np.empty_like(m), np.empty_like(c)
+        for i in range(t1 - t0 - 1, -1, -1):
+            t = t0 + i
+            if t == store.t_max:
+                ms, cs = m[i], c[i]
+            else:
+                g_next = transition_at(g, t + 1)
+                b = _backward_gain(c[i], g_next, r[i])
+                ms_next, cs_next = ms, cs
+                ms = m[i] + b @ (ms_next - a[i])
+                cs = c[i] + b @ (cs_next - r[i]) @ b.T
+                cs = 0.5 * (cs + cs.T)
+                if cross is not None or innovation is not None:
+                    lag = cs_next @ b.T
+                    if cross is not None:
+                        cross[t + 1] = lag
+                    if innovation is not None:
+                        innovation[t + 1] = innovation_outer(g_next, ms_next, cs_next, ms, cs, lag)
+            ms_block[i], cs_block[i] = ms, cs
+        out.write_block(t0, m=ms_block, c=cs_block)
+    out.flush()
+    return out
+
+
+def ffbs_sample(
+    rng: np.random.Generator,
+    store: FilterStore,
+    g: np.ndarray,
+    chunk_size: int = 4096,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """One backward-simulation draw x_{0:t_max} (eq:ffbs_B--eq:ffbs_cond) from streamed moments.
+
+    Normals are drawn one time step at a time in reverse order, so the draw does not depend
+    on `chunk_size` or on where the filter moments live. `out` may be a memmap.
+    """
+    d = store.d
+    out = np.empty((store.t_max + 1, d)) if out is None else out
+    x = None
+    for t0, t1, a, r, m, c in store.iter_reverse_chunks(chunk_size):
+        for i in range(t1 - t0 - 1, -1, -1):
+            t = t0 + i
+            if t == store.t_max:
+                mean, cov = m[i], c[i]
+            else:
+                b = _backward_gain(c[i], transition_at(g, t + 1), r[i])
+                mean = m[i] + b @ (x - a[i])
+                cov = c[i] - b @ r[i] @ b.T
+            cov = 0.5 * (cov + cov.T) + VARIANCE_FLOOR * np.eye(d)
+            x = mean + np.linalg.cholesky(cov) @ rng.standard_normal(d)
+            out[t] = x
+    return out
+
+
+def lag_one_covariances(store: FilterStore, smoothed: FilterStore, g: np.ndarray, t_min: int = 1) -> np.ndarray:
+    """Smoothed cross-covariances C*_{t,t-1} = C*_t B_{t-1}', t = t_min..t_max (earlier entries zero).
+
+    Standalone second pass over the stores; `rts_smoother(..., cross=...)` emits the same values.
+    """
+    out = np.zeros((store.t_max + 1, store.d, store.d))
+    for t in range(max(t_min, 1), store.t_max + 1):
+        _a, r, m, c = store.read(t - 1, t + 1)
+        b = _backward_gain(c[0], transition_at(g, t), r[1])
+        out[t] = np.asarray(smoothed.c[t]) @ b.T
+    return out
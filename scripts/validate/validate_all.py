@@ -10,15 +10,37 @@ from typing import List
 
 import numpy as np
 
+from checkpoint_resume import run as run_checkpoint_resume
 from common import ValidationResult
 from conditional_ig import run as run_conditional_ig
+from conditional_ig import run_batched as run_conditional_ig_batched
 from conditional_iw import run as run_conditional_iw
+from conditional_iw import run_batched as run_conditional_iw_batched
 from joint_marginal_consistency import run as run_joint_marginal
 from kalman_bruteforce import run as run_kalman_bruteforce
+from ensemble_filter import run as run_ensemble_filter
+from discount_grid import run as run_discount_grid
+from finite_difference import run as run_finite_difference
+from forecast_refit import run as run_forecast_refit
+from forecast_service import run as run_forecast_service
+from incremental_cavi import run as run_incremental_cavi
+from innovation_diagnostics import run as run_innovation_diagnostics
 from lambda_grad_hess import run as run_lambda_grad_hess
 from likelihood_normalization import run as run_likelihood_normalization
+from memmap_filtering import run as run_memmap_filtering
+from moment_accumulation import run as run_moment_accumulation
 from parity_with_exdqlm import run_parity, write_markdown as write_parity_markdown
+from rao_blackwell import run as run_rao_blackwell
 from replicate_assimilation import run as run_replicate_assimilation
+from rolling_origin import run as run_rolling_origin
+from scoring import run as run_scoring
+from site_scheduler import run as run_site_scheduler
+from smoother_moments import run as run_smoother_moments
+from sparse_design import run as run_sparse_design
+from structured_transition import run as run_structured_transition
+from sse_reduction import run as run_sse_reduction
+from svi import run as run_svi
+from variance_learning import run as run_variance_learning
 
 
 def run_validators(seed: int = 20260207) -> List[ValidationResult]:
@@ -26,11 +48,35 @@ def run_validators(seed: int = 20260207) -> List[ValidationResult]:
     return [
         run_likelihood_normalization(rng),
         run_joint_marginal(rng),
+        run_likelihood_normalization(rng, mode="gauss_hermite"),
+        run_joint_marginal(rng, mode="gauss_hermite"),
         run_conditional_ig(rng),
         run_conditional_iw(rng),
+        run_conditional_ig_batched(rng),
+        run_conditional_iw_batched(rng),
         run_lambda_grad_hess(rng),
+        run_finite_difference(rng),
         run_kalman_bruteforce(rng),
+        run_memmap_filtering(rng),
+        run_checkpoint_resume(rng),
+        run_ensemble_filter(rng),
+        run_structured_transition(rng),
+        run_sparse_design(rng),
+        run_site_scheduler(rng),
+        run_forecast_service(rng),
+        run_variance_learning(rng),
+        run_incremental_cavi(rng),
+        run_svi(rng),
+        run_discount_grid(rng),
+        run_rolling_origin(rng),
+        run_scoring(rng),
+        run_forecast_refit(rng),
+        run_smoother_moments(rng),
+        run_sse_reduction(rng),
+        run_innovation_diagnostics(rng),
         run_replicate_assimilation(rng),
+        run_moment_accumulation(rng),
+        run_rao_blackwell(rng),
     ]
 
 
@@ -63,11 +109,36 @@ def write_validation_markdown(results: List[ValidationResult], output_path: Path
     lines.append("- scripts/validate/validate_all.py")
     lines.append("- scripts/validate/likelihood_normalization.py")
     lines.append("- scripts/validate/joint_marginal_consistency.py")
+    lines.append("- scripts/validate/quadrature.py")
     lines.append("- scripts/validate/conditional_ig.py")
     lines.append("- scripts/validate/conditional_iw.py")
     lines.append("- scripts/validate/lambda_grad_hess.py")
+    lines.append("- scripts/validate/finite_difference.py")
     lines.append("- scripts/validate/kalman_bruteforce.py")
     lines.append("- scripts/validate/replicate_assimilation.py")
+    lines.append("- scripts/validate/state_space.py")
+    lines.append("- scripts/validate/memmap_filtering.py")
+    lines.append("- scripts/validate/checkpoint.py")
+    lines.append("- scripts/validate/gibbs.py")
+    lines.append("- scripts/validate/cavi.py")
+    lines.append("- scripts/validate/checkpoint_resume.py")
+    lines.append("- scripts/validate/ensemble_filter.py")
+    lines.append("- scripts/validate/structured_transition.py")
+    lines.append("- scripts/validate/sparse_design.py")
+    lines.append("- scripts/validate/site_scheduler.py")
+    lines.append("- scripts/validate/forecast_service.py")
+    lines.append("- scripts/validate/variance_learning.py")
+    lines.append("- scripts/validate/incremental_cavi.py")
+    lines.append("- scripts/validate/svi.py")
+    lines.append("- scripts/validate/discount_grid.py")
+    lines.append("- scripts/validate/rolling_origin.py")
+    lines.append("- scripts/validate/scoring.py")
+    lines.append("- scripts/validate/forecast_refit.py")
+    lines.append("- scripts/validate/smoother_moments.py")
+    lines.append("- scripts/validate/sse_reduction.py")
+    lines.append("- scripts/validate/innovation_diagnostics.py")
+    lines.append("- scripts/validate/moment_accumulation.py")
+    lines.append("- scripts/validate/rao_blackwell.py")
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
     output_path.write_text("\n".join(lines), encoding="utf-8")
@@ -97,12 +168,18 @@ def main() -> None:
         type=Path,
         default=Path("REPORT/03_parity_with_exDQLM.md"),
     )
+    parser.add_argument(
+        "--parity-index",
+        type=Path,
+        default=None,
+        help="On-disk labeled-equation index reused across parity runs.",
+    )
     args = parser.parse_args()
 
     results = run_validators()
     pass_all = all(r.passed for r in results)
 
-    parity_report = run_parity(args.reference_main, args.ndlm_sections_root)
+    parity_report = run_parity(args.reference_main, args.ndlm_sections_root, args.parity_index)
     args.parity_json_output.parent.mkdir(parents=True, exist_ok=True)
     args.parity_json_output.write_text(
         json.dumps(parity_report, indent=2, sort_keys=True), encoding="utf-8"
@@ -0,0 +1,41 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from conditional_ig import run_batched as run_ig_batched, sample_ig_batched  # type: ignore
+from conditional_iw import (  # type: ignore
+    iw_posterior_params,
+    pad_spd_stack,
+    random_spd,
+    run_batched as run_iw_batched,
+    sample_iw_batched,
+    unpad_stack,
+)
+
+
+def test_batched_conjugate_validators_pass():
+    rng = np.random.default_rng(7)
+    for result in (run_ig_batched(rng), run_iw_batched(rng)):
+        assert result.passed, result.diagnostics
+
+
+def test_ragged_iw_draws_are_spd_and_unpad_to_lead_dimensions():
+    rng = np.random.default_rng(11)
+    dims = [2, 5, 3, 1]
+    s_pad, d_arr = pad_spd_stack([random_spd(rng, d) for d in dims])
+    u = np.zeros((len(dims), s_pad.shape[-1]))
+    for k, d in enumerate(dims):
+        u[k, :d] = rng.normal(size=d)
+    nu1, s1 = iw_posterior_params(d_arr + 3.0, s_pad, u)
+
+    draws = unpad_stack(sample_iw_batched(rng, nu1, s1, d_arr), d_arr)
+    assert [w.shape[0] for w in draws] == dims
+    for w in draws:
+        assert np.all(np.linalg.eigvalsh(w) > 0.0)
+
+    sigma2 = sample_ig_batched(rng, np.full(6, 3.0), np.full(6, 2.0))
+    assert sigma2.shape == (6,) and np.all(sigma2 > 0.0)
@@ -0,0 +1,36 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from checkpoint import TraceWriter, load_checkpoint, read_trace, restore_rng, rng_state, save_checkpoint  # type: ignore
+
+
+def test_rng_state_round_trips_through_checkpoint(tmp_path):
+    rng = np.random.default_rng(5)
+    rng.normal(size=3)
+    save_checkpoint(tmp_path / "c.npz", {"v": np.arange(3.0)}, {"rng": rng_state(rng), "iteration": 3})
+    arrays, meta = load_checkpoint(tmp_path / "c.npz")
+    np.testing.assert_array_equal(arrays["v"], np.arange(3.0))
+    assert meta["iteration"] == 3
+    np.testing.assert_array_equal(restore_rng(meta["rng"]).normal(size=4), rng.normal(size=4))
+    assert not (tmp_path / "c.npz.tmp").exists()
+
+
+def test_trace_writer_truncates_to_cursor_and_appends(tmp_path):
+    writer = TraceWriter(tmp_path, {"s": (2,)})
+    for i in range(4):
+        writer.append(s=np.full(2, float(i)))
+    writer.close()
+
+    writer = TraceWriter(tmp_path, {"s": (2,)}, cursor=2)
+    writer.append(s=np.full(2, 9.0))
+    writer.close()
+    np.testing.assert_array_equal(read_trace(tmp_path, "s", (2,))[:, 0], [0.0, 1.0, 9.0])
+
+    with pytest.raises(ValueError):
+        TraceWriter(tmp_path, {"s": (2,)}, cursor=10)
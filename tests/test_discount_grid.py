@@ -0,0 +1,28 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from discount_grid import discount_filter, discount_grid_loglik, product_grid, simulate_discount_system  # type: ignore
+
+
+def test_grid_batches_match_single_configuration_filters():
+    rng = np.random.default_rng(13)
+    blocks = [(0, 2), (2, 4)]
+    obs, g, m0, c0 = simulate_discount_system(rng, 25, blocks, np.array([0.95, 0.9]), n_sources=2)
+    grid = product_grid([0.9, 0.97, 1.0], [0.8, 0.95])
+    batched = discount_grid_loglik(obs, g, blocks, grid, m0, c0, 25, chunk_size=4)
+    loop = [discount_filter(obs, g, blocks, delta, m0, c0, 25)[0] for delta in grid]
+    np.testing.assert_allclose(batched, loop, rtol=0, atol=1e-9)
+
+
+def test_discount_factors_outside_unit_interval_are_rejected():
+    rng = np.random.default_rng(14)
+    blocks = [(0, 2)]
+    obs, g, m0, c0 = simulate_discount_system(rng, 5, blocks, np.array([0.95]), n_sources=1)
+    with pytest.raises(ValueError):
+        discount_grid_loglik(obs, g, blocks, np.array([[1.2]]), m0, c0, 5)
@@ -0,0 +1,38 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from ensemble_filter import filter_ensemble, simulate_ensemble  # type: ignore
+
+
+def test_float32_mode_halves_storage_and_passes_guard():
+    rng = np.random.default_rng(3)
+    args = simulate_ensemble(rng, n_series=200, t_max=30)
+    low = filter_ensemble(rng, *args, precision="float32")
+    ref = filter_ensemble(rng, *args, precision="float64")
+    assert low.m.dtype == np.float32 and low.loglik.dtype == np.float64
+    assert low.m.nbytes * 2 == ref.m.nbytes
+    assert low.guard["passed"] == 1.0 and low.guard["fallback"] == 0.0
+    np.testing.assert_allclose(low.loglik, ref.loglik, rtol=1e-5)
+
+
+def test_guard_falls_back_to_float64_when_tolerance_is_unreachable():
+    rng = np.random.default_rng(4)
+    args = simulate_ensemble(rng, n_series=50, t_max=20)
+    result = filter_ensemble(rng, *args, precision="float32", mean_tol=1e-14)
+    assert result.guard["fallback"] == 1.0
+    assert result.m.dtype == np.float64
+
+
+def test_guard_checks_final_covariances():
+    rng = np.random.default_rng(5)
+    args = simulate_ensemble(rng, n_series=50, t_max=20)
+    low = filter_ensemble(rng, *args, precision="float32")
+    assert low.c.dtype == np.float32
+    assert 0.0 < low.guard["max_scaled_cov_error"] < 1e-5
+    strict = filter_ensemble(rng, *args, precision="float32", cov_tol=1e-14)
+    assert strict.guard["fallback"] == 1.0
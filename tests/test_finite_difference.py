@@ -0,0 +1,25 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from finite_difference import central_differences, run  # type: ignore
+
+
+def test_central_differences_recover_quadratic_form():
+    rng = np.random.default_rng(2)
+    a = rng.normal(size=(30, 3, 3))
+    prec = a @ np.swapaxes(a, -1, -2) + np.eye(3)
+    x = rng.normal(size=(30, 3))
+
+    grad, hess = central_differences(lambda pts: -0.5 * np.einsum("nki,nij,nkj->nk", pts, prec, pts), x)
+    assert np.allclose(grad, -np.einsum("nij,nj->ni", prec, x), atol=1e-8)
+    assert np.allclose(hess, -prec, atol=1e-5)
+
+
+def test_batched_log_kernel_checks_pass():
+    result = run(np.random.default_rng(4), n_configs=50)
+    assert result.passed, result.diagnostics
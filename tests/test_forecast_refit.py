@@ -0,0 +1,42 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from cavi import run_cavi  # type: ignore
+from forecast_refit import (  # type: ignore
+    cache_from_cavi,
+    forecast_cavi,
+    forecast_gibbs,
+    load_terminal_cache,
+    save_terminal_cache,
+)
+from state_space import simulate_model  # type: ignore
+
+
+def test_cache_round_trip_and_refit_from_loaded_cache(tmp_path):
+    rng = np.random.default_rng(41)
+    spec, _x, _sigma2, _w = simulate_model(rng, t_hist=30, n_leads=3)
+    cache = cache_from_cavi(spec, run_cavi(spec, tol=1e-8))
+    save_terminal_cache(tmp_path / "terminal.npz", cache)
+    loaded = load_terminal_cache(tmp_path / "terminal.npz")
+    assert loaded.t_hist == cache.t_hist
+    np.testing.assert_array_equal(loaded.c, cache.c)
+
+    before = forecast_cavi(spec, cache, spec.nu0 + 2.0, spec.s0)
+    after = forecast_cavi(spec, loaded, spec.nu0 + 2.0, spec.s0)
+    np.testing.assert_array_equal(before.s, after.s)
+    np.testing.assert_array_equal(after.nu, spec.nu0 + 3.0)
+
+
+def test_shorter_horizon_drops_later_leads():
+    rng = np.random.default_rng(42)
+    spec, _x, _sigma2, _w = simulate_model(rng, t_hist=25, n_leads=4)
+    cache = cache_from_cavi(spec, run_cavi(spec, tol=1e-8))
+    state = forecast_cavi(spec, cache, spec.nu0[:2], spec.s0[:2])
+    assert state.s.shape == (2, spec.d, spec.d)
+    xs, ws = forecast_gibbs(rng, spec, cache, spec.nu0[:2], spec.s0[:2], 5)
+    assert xs.shape == (5, 3, spec.d) and ws.shape == (5, 2, spec.d, spec.d)
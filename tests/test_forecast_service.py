@@ -0,0 +1,81 @@
+from pathlib import Path
+import asyncio
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from forecast_service import ForecastService, site_from_spec  # type: ignore
+from state_space import simulate_model  # type: ignore
+
+
+def test_prediction_queued_after_observation_sees_the_update():
+    rng = np.random.default_rng(6)
+    spec, _x, sigma2, w_fcast = simulate_model(rng, t_hist=6, n_leads=2)
+    site = site_from_spec(spec, sigma2, w_fcast, t_end=4)
+    h = spec.obs.h[0]
+    sel = spec.obs.t == 5
+
+    async def scenario():
+        async with ForecastService({"a": site}, max_delay=0.01) as service:
+            before = service.predict("a", h, 0)
+            update = service.observe("a", 5, spec.obs.y[sel], spec.obs.h[sel], spec.obs.r[sel], spec.obs.source[sel])
+            after = service.predict("a", h, 0)
+            return await asyncio.gather(before, update, after), service.batches
+
+    (before, _ll, after), batches = asyncio.run(scenario())
+    assert batches == 1
+    assert before != after
+    assert site.t == 5
+
+
+def test_k_step_beyond_forecast_block_is_rejected():
+    rng = np.random.default_rng(7)
+    spec, _x, sigma2, w_fcast = simulate_model(rng, t_hist=5, n_leads=2)
+    site = site_from_spec(spec, sigma2, w_fcast)
+    assert site.max_lead == 2
+    with pytest.raises(ValueError):
+        site.ahead(3)
+
+
+def test_malformed_predict_fails_alone_and_the_service_keeps_answering():
+    rng = np.random.default_rng(8)
+    spec, _x, sigma2, w_fcast = simulate_model(rng, t_hist=5, n_leads=2)
+    site = site_from_spec(spec, sigma2, w_fcast)
+    h = spec.obs.h[0]
+
+    async def scenario():
+        async with ForecastService({"a": site}, max_delay=0.01) as service:
+            results = await asyncio.gather(
+                service.predict("a", h[:-1], 0),
+                service.predict("a", h, spec.n_sources),
+                service.predict("a", h, 0),
+                return_exceptions=True,
+            )
+            later = await asyncio.wait_for(service.predict("a", h, 0), timeout=1.0)
+            return results, later, service._worker.done()
+
+    (bad_shape, bad_source, good), later, worker_done = asyncio.run(scenario())
+    assert isinstance(bad_shape, ValueError) and isinstance(bad_source, ValueError)
+    assert good == later
+    assert not worker_done
+
+
+def test_stop_cancels_requests_left_in_the_queue():
+    rng = np.random.default_rng(9)
+    spec, _x, sigma2, w_fcast = simulate_model(rng, t_hist=5, n_leads=2)
+    service = ForecastService({"a": site_from_spec(spec, sigma2, w_fcast)})
+
+    async def scenario():
+        await service.start()
+        service._worker.cancel()  # drain task gone before it picks the request up
+        pending = asyncio.ensure_future(service.predict("a", spec.obs.h[0], 0))
+        await asyncio.sleep(0)
+        await service.stop()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(scenario())
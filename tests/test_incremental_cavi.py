@@ -0,0 +1,46 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from cavi import run_cavi, smooth_state_factor, warm_start  # type: ignore
+from incremental_cavi import truncate_spec  # type: ignore
+from state_space import simulate_model  # type: ignore
+
+
+def test_warm_start_at_the_optimum_stops_immediately():
+    rng = np.random.default_rng(10)
+    spec, _x, _sigma2, _w = simulate_model(rng, t_hist=30, n_leads=2)
+    state = run_cavi(spec, tol=1e-12, max_iter=500)
+    factor = smooth_state_factor(spec, state)
+    warm_state, warm = warm_start(spec, state, factor, spec, window=5)
+    refit = run_cavi(spec, state=warm_state, warm=warm, tol=1e-6)
+    assert refit.iteration == 2
+    np.testing.assert_allclose(refit.b / refit.a, state.b / state.a, rtol=1e-6)
+
+
+def test_warm_start_rejects_bad_windows():
+    rng = np.random.default_rng(11)
+    spec, _x, _sigma2, _w = simulate_model(rng, t_hist=12, n_leads=2)
+    prev = truncate_spec(spec, 10)
+    state = run_cavi(prev, max_iter=3)
+    factor = smooth_state_factor(prev, state)
+    with pytest.raises(ValueError):
+        warm_start(prev, state, factor, spec, window=11)
+    with pytest.raises(ValueError):
+        warm_start(spec, state, factor, prev, window=2)
+
+
+def test_tail_window_elbo_trace_never_decreases():
+    rng = np.random.default_rng(12)
+    spec, _x, _sigma2, _w = simulate_model(rng, t_hist=62, n_leads=3)
+    prev = truncate_spec(spec, 60)
+    state = run_cavi(prev, tol=1e-10)
+    warm_state, warm = warm_start(prev, state, smooth_state_factor(prev, state), spec, window=10)
+    tail = run_cavi(spec, state=warm_state, warm=warm, tol=1e-10)
+    assert tail.iteration > 2
+    assert np.all(np.diff(tail.elbo) >= -1e-8 * (1.0 + np.abs(tail.elbo[1:])))
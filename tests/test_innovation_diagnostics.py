@@ -0,0 +1,46 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from conditional_iw import random_spd  # type: ignore
+from innovation_diagnostics import (  # type: ignore
+    batched_forward_solve,
+    chi2_summary,
+    forecast_quadratic_forms,
+    historical_quadratic_forms,
+)
+
+
+def test_quadratic_forms_match_explicit_inverses_across_chunks():
+    rng = np.random.default_rng(71)
+    d, t_hist, n_leads, n_draws = 3, 6, 2, 9
+    g = 0.8 * np.eye(d)
+    q = np.stack([random_spd(rng, d) for _ in range(t_hist + 1)])
+    w = np.stack([[random_spd(rng, d) for _ in range(n_leads)] for _ in range(n_draws)])
+    x = rng.normal(size=(n_draws, t_hist + n_leads + 1, d))
+
+    hist = historical_quadratic_forms(x, g, q, [(0, 1), (1, 3)], t_hist, draw_chunk=4)
+    e = x[:, 1 : t_hist + 1] - x[:, :t_hist] @ g.T
+    ref = np.einsum("sti,tij,stj->st", e[:, :, 1:], np.linalg.inv(q[1:, 1:, 1:]), e[:, :, 1:])
+    np.testing.assert_allclose(hist[:, :, 1], ref, rtol=1e-12)
+
+    fcast = forecast_quadratic_forms(x, g, w, t_hist)
+    u = x[:, t_hist + 1 :] - x[:, t_hist:-1] @ g.T
+    ref_f = np.einsum("ski,skij,skj->sk", u, np.linalg.inv(w), u)
+    np.testing.assert_allclose(fcast, ref_f, rtol=1e-12)
+
+    chol = np.linalg.cholesky(w.reshape(-1, d, d))
+    b = u.reshape(-1, d)
+    z = batched_forward_solve(chol, b)
+    np.testing.assert_allclose(np.einsum("nij,nj->ni", chol, z), b, atol=1e-12)
+
+
+def test_chi2_summary_of_exact_draws_is_calibrated():
+    rng = np.random.default_rng(72)
+    summary = chi2_summary(rng.chisquare(3, size=20000), 3)
+    assert abs(summary["mean_over_dof"] - 1.0) < 0.03
+    assert summary["ks_distance"] < 0.02
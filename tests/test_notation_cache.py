@@ -0,0 +1,46 @@
+from pathlib import Path
+import shutil
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "extract_notation"))
+
+import check_notation  # type: ignore
+from check_notation import extract_tex_tree, run_checks  # type: ignore
+
+
+def test_cache_reprocesses_only_changed_files(tmp_path):
+    tex_root = tmp_path / "derivations"
+    shutil.copytree(REPO_ROOT / "docs" / "derivations", tex_root)
+    notation = tex_root / "notation.yaml"
+    cache = tmp_path / "cache" / "notation.json"
+
+    _files, reprocessed = extract_tex_tree(tex_root, cache)
+    assert reprocessed == len(list(tex_root.rglob("*.tex")))
+    assert extract_tex_tree(tex_root, cache)[1] == 0
+
+    section = tex_root / "sections" / "09_predictive.tex"
+    section.write_text(section.read_text(encoding="utf-8") + "\n$\\tau_{t,n}$\n", encoding="utf-8")
+    assert extract_tex_tree(tex_root, cache)[1] == 1
+
+    _summary, raw_cached = run_checks(tex_root, notation, cache)
+    _summary, raw_fresh = run_checks(tex_root, notation)
+    assert raw_cached == raw_fresh
+    assert "tau" in raw_cached["index_usage"]
+
+
+def test_cache_survives_a_move_but_not_an_extractor_change(tmp_path, monkeypatch):
+    tex_root = tmp_path / "old" / "derivations"
+    shutil.copytree(REPO_ROOT / "docs" / "derivations", tex_root)
+    cache = tmp_path / "notation.json"
+    n_files = extract_tex_tree(tex_root, cache)[1]
+
+    moved = tmp_path / "new" / "derivations"
+    shutil.move(str(tex_root), str(moved))
+    files, reprocessed = extract_tex_tree(moved, cache)
+    assert reprocessed == 0
+    assert all(path.startswith(str(moved)) for path in files)
+
+    monkeypatch.setattr(check_notation, "INDEX_BASE_IGNORES", check_notation.INDEX_BASE_IGNORES | {"x"})
+    assert extract_tex_tree(moved, cache)[1] == n_files
+    assert "x" not in run_checks(moved, moved / "notation.yaml", cache)[1]["index_usage"]
@@ -0,0 +1,35 @@
+from pathlib import Path
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from parity_with_exdqlm import run_parity, run_parity_many  # type: ignore
+
+SECTIONS = REPO_ROOT / "docs" / "derivations" / "sections"
+
+
+def test_parity_many_reuses_index_and_matches_single(tmp_path):
+    tex = "\n".join(path.read_text(encoding="utf-8") for path in sorted(SECTIONS.glob("*.tex")))
+    ref_same = tmp_path / "same" / "main.tex"
+    ref_edit = tmp_path / "edited" / "main.tex"
+    ref_same.parent.mkdir()
+    ref_edit.parent.mkdir()
+    ref_same.write_text(tex, encoding="utf-8")
+    ref_edit.write_text(tex.replace("\\label{eq:A_theta}", ""), encoding="utf-8")
+    index = tmp_path / "index.json"
+
+    first = run_parity_many([ref_same, ref_edit], SECTIONS, index)
+    n_docs = 2 + len(list(SECTIONS.glob("*.tex")))
+    assert first["documents_reindexed"] == n_docs
+    second = run_parity_many([ref_same, ref_edit], SECTIONS, index)
+    assert second["documents_reindexed"] == 0
+    assert second["references"] == first["references"]
+
+    same = first["references"][str(ref_same)]
+    edited = first["references"][str(ref_edit)]
+    # Identical text: shared labels match, but the likelihood labels are not different.
+    assert same["shared_equation_labels_matched"] == same["shared_equation_labels_expected_equal"]
+    assert same["status"] == "FAIL"
+    assert "eq:A_theta (missing in one repo)" in edited["unexpected_differences"]
+    assert run_parity(ref_edit, SECTIONS) == edited
@@ -0,0 +1,29 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from joint_marginal_consistency import run as run_joint_marginal  # type: ignore
+from likelihood_normalization import run as run_likelihood_normalization  # type: ignore
+from quadrature import gaussian_expectation  # type: ignore
+
+
+def test_tensor_rule_is_exact_for_second_moments():
+    rng = np.random.default_rng(3)
+    mean = rng.normal(size=(50, 2))
+    a = rng.normal(size=(50, 2, 2))
+    cov = a @ np.swapaxes(a, -1, -2) + np.eye(2)
+
+    second, unresolved = gaussian_expectation(lambda x, rows: np.sum(x**2, axis=-1), mean, cov, order=8)
+    expected = np.trace(cov, axis1=-2, axis2=-1) + np.sum(mean**2, axis=-1)
+    assert unresolved == 0
+    assert np.allclose(second, expected, rtol=1e-12)
+
+
+def test_gauss_hermite_modes_pass():
+    rng = np.random.default_rng(5)
+    assert run_likelihood_normalization(rng, n_cases=500, mode="gauss_hermite").passed
+    assert run_joint_marginal(rng, n_cases=500, mode="gauss_hermite").passed
@@ -0,0 +1,61 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from rolling_origin import ForecastScores, refit_origin, rolling_origin_forecasts  # type: ignore
+from state_space import ObservationList, kalman_filter, simulate_model  # type: ignore
+
+
+def test_snapshot_forecasts_match_per_origin_refits():
+    rng = np.random.default_rng(21)
+    spec, _x, sigma2, w_fcast = simulate_model(rng, t_hist=40, n_leads=2)
+    obs = spec.with_variances(sigma2)
+    origins = [10, 25, 38]
+    fast = rolling_origin_forecasts(obs, spec.g, spec.q_hist, spec.m0, spec.c0, origins, w_fcast, chunk_size=2)
+    slow = ForecastScores.concatenate(
+        [refit_origin(obs, spec.g, spec.q_hist, spec.m0, spec.c0, o, w_fcast, obs) for o in origins]
+    )
+    np.testing.assert_array_equal(fast.origin, slow.origin)
+    np.testing.assert_array_equal(fast.lead, slow.lead)
+    np.testing.assert_allclose(fast.mean, slow.mean, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(fast.var, slow.var, rtol=0, atol=1e-10)
+    assert set(fast.lead.tolist()) == {1, 2}
+    assert np.all(np.isfinite(fast.log_score()))
+
+
+def test_bridged_forecasts_match_refits_and_the_bridge_moments():
+    rng = np.random.default_rng(22)
+    spec, _x, sigma2, w_fcast = simulate_model(rng, t_hist=30, n_leads=2)
+    obs = spec.with_variances(sigma2)
+    bridge = np.array([[1.0, 0.0], [0.5, 0.5], [0.0, 2.0]])
+    g_fcast = np.diag([0.9, 0.7, 0.5])
+    w_bridge = np.stack([0.05 * np.eye(3) + 0.01 * k for k in range(2)])
+    targets = ObservationList(
+        t=obs.t, n=obs.n, y=obs.y, h=np.hstack([obs.h, np.ones((len(obs), 1))]), r=obs.r, source=obs.source
+    )
+    origins = [12, 27]
+    fast = rolling_origin_forecasts(
+        obs, spec.g, spec.q_hist, spec.m0, spec.c0, origins, w_bridge, bridge, targets=targets, g_fcast=g_fcast
+    )
+    slow = ForecastScores.concatenate(
+        [
+            refit_origin(obs, spec.g, spec.q_hist, spec.m0, spec.c0, o, w_bridge, targets, None, bridge, g_fcast)
+            for o in origins
+        ]
+    )
+    np.testing.assert_allclose(fast.mean, slow.mean, rtol=0, atol=1e-10)
+    np.testing.assert_allclose(fast.var, slow.var, rtol=0, atol=1e-10)
+
+    # Lead one from the origin's filtered moments: N(h'G_f H m_T, h'(G_f H C_T H'G_f' + W_1)h + r).
+    hist = kalman_filter(obs.time_window(1, 12), spec.g, spec.q_hist, spec.m0, spec.c0, 12).store
+    a = g_fcast @ bridge
+    rows = targets.time_window(13, 13)
+    h = rows.dense_h()
+    first = (fast.origin == 12) & (fast.lead == 1)
+    np.testing.assert_allclose(fast.mean[first], h @ a @ hist.m[12], atol=1e-10)
+    expected_var = np.einsum("nd,de,ne->n", h, a @ hist.c[12] @ a.T + w_bridge[0], h) + rows.r
+    np.testing.assert_allclose(fast.var[first], expected_var, atol=1e-10)
@@ -0,0 +1,80 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from scoring import (  # type: ignore
+    draw_predictive_moments,
+    gaussian_crps,
+    score_draws,
+    score_gaussian,
+    score_mixture,
+    score_mixture_source,
+)
+from state_space import simulate_model  # type: ignore
+
+
+def test_single_component_mixture_equals_gaussian_scores():
+    rng = np.random.default_rng(31)
+    y, mean, var = rng.normal(size=50), rng.normal(size=50), rng.uniform(0.5, 2.0, size=50)
+    gauss = score_gaussian(y, mean, var)
+    mix = score_mixture(y, mean[None], var[None])
+    for name in ("pit", "crps", "log_score"):
+        np.testing.assert_allclose(getattr(mix, name), getattr(gauss, name), rtol=0, atol=1e-12)
+
+
+def test_mixture_scores_do_not_depend_on_draw_chunking():
+    rng = np.random.default_rng(32)
+    means, var = rng.normal(size=(13, 30)), rng.uniform(0.2, 1.0, size=(13, 30))
+    y = rng.normal(size=30)
+    whole = score_mixture(y, means, var, draw_chunk=13)
+    chunked = score_mixture(y, means, var, draw_chunk=4)
+    for name in ("pit", "crps", "log_score"):
+        np.testing.assert_allclose(getattr(chunked, name), getattr(whole, name), rtol=0, atol=1e-12)
+
+
+def test_draw_scores_build_component_moments_one_draw_chunk_at_a_time(tmp_path):
+    rng = np.random.default_rng(33)
+    spec, _x, _sigma2, _w = simulate_model(rng, t_hist=12, n_leads=2)
+    obs = spec.obs
+    x = np.memmap(tmp_path / "x.f64", dtype=float, mode="w+", shape=(11, spec.t_max + 1, spec.d))
+    x[:] = rng.normal(size=x.shape)
+    sigma2 = rng.uniform(0.2, 1.0, size=(11, spec.n_sources))
+    whole = score_mixture(obs.y, *draw_predictive_moments(obs, x, sigma2))
+
+    requested = []
+
+    def moments(draws):
+        requested.append(draws.size)
+        return draw_predictive_moments(obs, x[draws], sigma2[draws])
+
+    streamed = score_mixture_source(obs.y, moments, 11, draw_chunk=4)
+    assert max(requested) <= 4
+    # max_block caps the pair block at draw_chunk^2 x point_chunk = 16 x 5 elements.
+    capped = score_draws(obs, x, sigma2, draw_chunk=4, max_block=80)
+    for scores in (streamed, capped):
+        for name in ("pit", "crps", "log_score"):
+            np.testing.assert_allclose(getattr(scores, name), getattr(whole, name), rtol=0, atol=1e-12)
+
+    # The trace is only ever indexed by (draws, times of the point chunk), never whole trajectories.
+    keys = []
+
+    class Trace:
+        shape = x.shape
+
+        def __getitem__(self, key):
+            keys.append(key)
+            return x[key]
+
+    score_draws(obs, Trace(), sigma2, draw_chunk=4, max_block=80)
+    assert all(isinstance(k, tuple) and k[0].shape[0] <= 4 and k[1].size <= 5 for k in keys)
+
+
+def test_gaussian_crps_at_the_mean_is_closed_form():
+    # CRPS(N(0, s^2), 0) = s (sqrt(2) - 1) / sqrt(pi).
+    s = 1.7
+    expected = s * (np.sqrt(2.0) - 1.0) / np.sqrt(np.pi)
+    assert abs(float(gaussian_crps(0.0, 0.0, s * s)) - expected) < 1e-12
@@ -0,0 +1,31 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from site_scheduler import fit_site, pack_sites, schedule_sites, unpack_site  # type: ignore
+from state_space import simulate_model  # type: ignore
+
+
+def test_pack_unpack_roundtrip_is_exact():
+    rng = np.random.default_rng(4)
+    specs = [simulate_model(rng, t_hist=5 + i, n_leads=2)[0] for i in range(3)]
+    packed = pack_sites(specs)
+    for i, spec in enumerate(specs):
+        site = unpack_site(packed, i)
+        np.testing.assert_array_equal(site.obs.y, spec.obs.y)
+        np.testing.assert_array_equal(site.obs.h, spec.obs.h)
+        np.testing.assert_array_equal(site.g, spec.g)
+        assert site.t_max == spec.t_max
+
+
+def test_scheduled_filter_matches_serial():
+    rng = np.random.default_rng(5)
+    specs = [simulate_model(rng, t_hist=6 + 2 * i, n_leads=2)[0] for i in range(3)]
+    results = dict(schedule_sites(specs, "filter", max_workers=2))
+    assert sorted(results) == [0, 1, 2]
+    for i, spec in enumerate(specs):
+        assert results[i]["loglik"] == fit_site(spec, "filter", {})["loglik"]
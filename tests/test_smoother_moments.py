@@ -0,0 +1,35 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from state_space import kalman_filter, lag_one_covariances, rts_smoother, simulate_model  # type: ignore
+
+
+def test_smoother_emits_second_pass_cross_covariances_for_any_chunking():
+    rng = np.random.default_rng(51)
+    spec, _x, sigma2, w = simulate_model(rng, t_hist=20, n_leads=2)
+    filt = kalman_filter(spec.with_variances(sigma2), spec.g, spec.transition_covariances(w), spec.m0, spec.c0, spec.t_max)
+    shape = (spec.t_max + 1, spec.d, spec.d)
+    cross, innovation = np.zeros(shape), np.zeros(shape)
+    smoothed = rts_smoother(filt.store, spec.g, chunk_size=5, cross=cross, innovation=innovation)
+    np.testing.assert_allclose(cross, lag_one_covariances(filt.store, smoothed, spec.g), rtol=0, atol=1e-14)
+
+    cross_one = np.zeros(shape)
+    rts_smoother(filt.store, spec.g, chunk_size=1, cross=cross_one)
+    np.testing.assert_array_equal(cross_one, cross)
+    # E[u u'] is a second moment, hence symmetric positive semi-definite.
+    assert np.all(np.linalg.eigvalsh(innovation[1:]) > -1e-12)
+
+
+def test_smoother_leaves_moments_before_t_min_untouched():
+    rng = np.random.default_rng(52)
+    spec, _x, sigma2, w = simulate_model(rng, t_hist=12, n_leads=2)
+    filt = kalman_filter(spec.with_variances(sigma2), spec.g, spec.transition_covariances(w), spec.m0, spec.c0, spec.t_max)
+    cross = np.zeros((spec.t_max + 1, spec.d, spec.d))
+    rts_smoother(filt.store, spec.g, t_min=6, cross=cross)
+    assert not np.any(cross[:7])
+    assert np.all(np.abs(cross[7:]).sum(axis=(1, 2)) > 0)
@@ -0,0 +1,70 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from gibbs import run_gibbs  # type: ignore
+from moment_accumulation import draw_lag_covariance  # type: ignore
+from state_moments import StateMoments, merge_moments, state_subset  # type: ignore
+from state_space import simulate_model  # type: ignore
+
+
+def _accumulate(draws, lags):
+    acc = StateMoments(draws.shape[1] - 1, draws.shape[2], lags)
+    for x in draws:
+        acc.update(x)
+    return acc
+
+
+def test_merged_chunks_match_moments_of_all_draws():
+    rng = np.random.default_rng(81)
+    draws = rng.normal(size=(23, 6, 2)) + np.arange(6)[None, :, None]
+    merged = merge_moments(_accumulate(chunk, (1, 3)) for chunk in np.split(draws, [4, 5, 15]))
+
+    assert merged.count == 23
+    np.testing.assert_allclose(merged.mean, draws.mean(axis=0), atol=1e-12)
+    np.testing.assert_allclose(merged.variance(), draws.var(axis=0, ddof=1), atol=1e-12)
+    for lag in (1, 3):
+        np.testing.assert_allclose(merged.lag_covariance(lag), draw_lag_covariance(draws, lag), atol=1e-12)
+
+    arrays, meta = merged.to_arrays()
+    restored = StateMoments.from_arrays(arrays, meta)
+    np.testing.assert_array_equal(restored.cross[3], merged.cross[3])
+
+
+def test_invalid_lags_and_subsets_are_rejected():
+    with pytest.raises(ValueError):
+        StateMoments(4, 2, lags=(5,))
+    with pytest.raises(ValueError):
+        StateMoments(4, 2, lags=(1,)).merge(StateMoments(4, 2, lags=(2,)))
+    with pytest.raises(ValueError):
+        state_subset(4, 2, times=[0, 5])
+    times, coords = state_subset(4, 2, coords=[1])
+    np.testing.assert_array_equal(times, np.arange(5))
+    np.testing.assert_array_equal(coords, [1])
+
+
+def test_rao_blackwell_mode_keeps_the_chain_and_merges_conditional_terms():
+    spec, _x, _sigma2, _w = simulate_model(np.random.default_rng(82), t_hist=8, n_leads=2)
+    parts = []
+    for seed in (3, 4):
+        acc = StateMoments(spec.t_max, spec.d, burn_in=2, rao_blackwell=True)
+        state = run_gibbs(spec, np.random.default_rng(seed), 6, moments=acc)
+        parts.append(acc)
+    np.testing.assert_array_equal(run_gibbs(spec, np.random.default_rng(4), 6).x, state.x)
+    assert parts[0].count == 4
+
+    merged = parts[0].merge(parts[1])
+    np.testing.assert_allclose(merged.cond_var, 0.5 * (parts[0].cond_var + parts[1].cond_var))
+    assert np.all(merged.variance() >= merged.cond_var)
+    arrays, meta = merged.to_arrays()
+    restored = StateMoments.from_arrays(arrays, meta)
+    np.testing.assert_array_equal(restored.lag_covariance(1), merged.lag_covariance(1))
+    with pytest.raises(ValueError):
+        merged.merge(StateMoments(spec.t_max, spec.d))
+    with pytest.raises(ValueError):
+        StateMoments(spec.t_max, spec.d, lags=(2,), rao_blackwell=True)
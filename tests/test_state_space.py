@@ -0,0 +1,53 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from kalman_bruteforce import simulate_system  # type: ignore
+from memmap_filtering import C0, G, M0, Q, toy_observations  # type: ignore
+from state_space import MemmapFilterStore, ObservationList, ffbs_sample, kalman_filter, rts_smoother  # type: ignore
+
+
+def test_streamed_backward_pass_is_chunk_size_invariant(tmp_path):
+    rng = np.random.default_rng(7)
+    t_max = 23
+    _x, y = simulate_system(rng, t_max=t_max, d=2)
+    obs = toy_observations(y)
+    reference = kalman_filter(obs, G, Q, M0, C0, t_max).store
+    ref_smooth = rts_smoother(reference, G, chunk_size=t_max + 1)
+    ref_draw = ffbs_sample(np.random.default_rng(3), reference, G, chunk_size=t_max + 1)
+
+    for chunk in (1, 5, 8):
+        store = MemmapFilterStore(tmp_path / f"f{chunk}", t_max, 2, chunk_size=chunk)
+        kalman_filter(obs, G, Q, M0, C0, t_max, store=store)
+        smooth = rts_smoother(store, G, chunk_size=chunk)
+        np.testing.assert_array_equal(smooth.m, ref_smooth.m)
+        np.testing.assert_array_equal(smooth.c, ref_smooth.c)
+        draw = ffbs_sample(np.random.default_rng(3), store, G, chunk_size=chunk)
+        np.testing.assert_array_equal(draw, ref_draw)
+
+
+def test_ffbs_draws_match_smoothed_moments():
+    rng = np.random.default_rng(11)
+    t_max = 6
+    _x, y = simulate_system(rng, t_max=t_max, d=2)
+    store = kalman_filter(toy_observations(y), G, Q, M0, C0, t_max).store
+    smooth = rts_smoother(store, G)
+    draws = np.stack([ffbs_sample(rng, store, G) for _ in range(4000)])
+    np.testing.assert_allclose(draws.mean(axis=0), smooth.m, atol=0.05)
+    np.testing.assert_allclose(draws.var(axis=0), np.diagonal(smooth.c, axis1=1, axis2=2), rtol=0.1)
+
+
+def test_sparse_rows_sort_with_their_indices_and_densify():
+    rows = [
+        (2, 0, 1.0, (np.array([3, 1]), np.array([2.0, -1.0])), 1.0, 0),
+        (1, 0, 0.5, (np.array([0]), np.array([4.0])), 1.0, 1),
+    ]
+    obs = ObservationList.from_sparse_tuples(rows, d=5)
+    assert obs.t.tolist() == [1, 2]
+    np.testing.assert_array_equal(obs.dense_h(), [[4.0, 0, 0, 0, 0], [0, -1.0, 0, 2.0, 0]])
+    idx, values = obs.row(1)
+    assert values @ np.arange(5.0)[idx] == 2.0 * 3 - 1.0
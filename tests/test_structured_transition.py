@@ -0,0 +1,30 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from structured_transition import model_a_transition, stacked_transition  # type: ignore
+
+
+def test_model_a_operator_matches_tilde_g():
+    rng = np.random.default_rng(2)
+    g = rng.normal(size=(2, 2))
+    c_t = np.array([0.3, -1.2, 0.5])
+    expected = np.zeros((6, 6))
+    expected[:2, :2] = g
+    expected[2, 2] = 0.8
+    expected[2, 3:] = c_t
+    expected[3:, 3:] = np.eye(3)
+    np.testing.assert_array_equal(model_a_transition(g, 0.8, c_t).toarray(), expected)
+
+
+def test_stacked_operator_is_block_diagonal_repeat_of_g():
+    rng = np.random.default_rng(3)
+    g = rng.normal(size=(3, 3))
+    op = stacked_transition(g, 4)
+    np.testing.assert_allclose(op.toarray(), np.kron(np.eye(5), g))
+    c = rng.normal(size=(15, 15))
+    np.testing.assert_allclose(op @ c @ op.T, np.kron(np.eye(5), g) @ c @ np.kron(np.eye(5), g).T)
@@ -0,0 +1,41 @@
+from pathlib import Path
+import sys
+from dataclasses import replace
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from cavi import cavi_step, initial_cavi_state  # type: ignore
+from sse_reduction import replicate_rows  # type: ignore
+from state_space import ObservationList, simulate_model  # type: ignore
+from svi import history_counts, step_size, svi_step  # type: ignore
+
+
+def test_robbins_monro_schedule_decreases_from_one():
+    rhos = [step_size(i, tau=0.0, kappa=0.6) for i in range(1, 50)]
+    assert rhos[0] == 1.0
+    assert all(b < a for a, b in zip(rhos, rhos[1:]))
+
+
+def test_full_window_step_is_a_cavi_step():
+    rng = np.random.default_rng(12)
+    spec, _x, _sigma2, _w = simulate_model(rng, t_hist=10, n_leads=2)
+    state = initial_cavi_state(spec)
+    svi = svi_step(rng, spec, state, history_counts(spec), window=10, buffer=12, tau=0.0)
+    ref = cavi_step(spec, state)
+    np.testing.assert_allclose(svi.b, ref.b, rtol=1e-12)
+    np.testing.assert_allclose(svi.s, ref.s, rtol=1e-12)
+
+
+def test_full_window_step_counts_replicates_like_cavi():
+    rng = np.random.default_rng(13)
+    spec, x, sigma2, _w = simulate_model(rng, t_hist=10, n_leads=2)
+    raw = replicate_rows(rng, spec, x, sigma2)
+    agg = replace(spec, obs=ObservationList.from_replicates(raw.t, raw.n, raw.y, raw.h, raw.r, raw.source))
+    state = initial_cavi_state(agg)
+    svi = svi_step(rng, agg, state, history_counts(agg), window=10, buffer=12, tau=0.0)
+    ref = cavi_step(agg, state)
+    np.testing.assert_allclose(svi.a, ref.a, rtol=1e-12)
+    np.testing.assert_allclose(svi.b, ref.b, rtol=1e-12)
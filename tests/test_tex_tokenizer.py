@@ -0,0 +1,50 @@
+from pathlib import Path
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "extract_notation"))
+
+from check_notation import run_checks, scan_tex  # type: ignore
+
+
+def test_scan_reports_math_spans_indexes_and_lines():
+    text = (
+        "\\newcommand{\\R}{\\mathbb{R}}\n"
+        "Text with $\\bm W_t^\\theta$ and 100\\% % ignored $x_{q}$\n"
+        "\\begin{align}\n"
+        "  \\bm x_{t,n}^{(f)} &= \\bm G_t\\bm x_{t-1} \\label{eq:a_b}\n"
+        "\\end{align}\n"
+        "\\(\\sigma_j^2\\)\n"
+    )
+    scan = scan_tex(text)
+
+    assert ("R", 1) in scan.definitions
+    assert [line for _start, _end, line in scan.math_spans] == [2, 3, 6]
+    indexed = {(base, parts, line) for base, parts, line in scan.indexed}
+    assert ("theta", ("t",), 2) not in indexed
+    assert ("W", ("t",), 2) in indexed
+    assert ("x", ("t", "n"), 4) in indexed
+    assert ("G", ("t",), 4) in indexed
+    assert ("x", ("t-1",), 4) in indexed
+    assert ("sigma", ("j",), 6) in indexed
+    assert not any(base in ("q", "a") for base, _parts, _line in indexed)
+    assert scan.math_macro_lines["sigma"] == 6 and scan.macro_lines["newcommand"] == 1
+
+
+def test_findings_point_at_source_lines():
+    summary, _raw = run_checks(
+        REPO_ROOT / "docs" / "derivations",
+        REPO_ROOT / "docs" / "derivations" / "notation.yaml",
+    )
+    for finding in summary.findings:
+        if finding.kind == "undefined_macro":
+            path, line = finding.location.rsplit(":", 1)
+            assert path.endswith(".tex") and int(line) >= 1
+
+
+def test_superscript_base_is_restored_only_right_after_its_group():
+    scan = scan_tex("$x^{a}_t + y^{b}2_s + z \\, w^2_k$ text \\foo $$q_1$$")
+    indexed = {(base, parts) for base, parts, _line in scan.indexed}
+    assert indexed == {("x", ("t",)), ("w", ("k",)), ("q", ("1",))}
+    assert scan.used_macros["foo"] == 1 and "foo" not in scan.math_macro_lines
+    assert [(start, end) for start, end, _line in scan.math_spans] == [(0, 33), (44, 51)]
@@ -0,0 +1,33 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "scripts" / "validate"))
+
+from state_space import kalman_filter, simulate_model  # type: ignore
+from variance_learning import variance_learning_filter  # type: ignore
+
+
+def test_scaled_mode_needs_a_single_source():
+    rng = np.random.default_rng(8)
+    spec, _x, _sigma2, w = simulate_model(rng, t_hist=4, n_leads=1, n_sources=2)
+    with pytest.raises(ValueError):
+        variance_learning_filter(
+            spec.obs, spec.g, spec.transition_covariances(w), spec.m0, spec.c0, spec.t_max, spec.a0, spec.b0, scaled=True
+        )
+
+
+def test_scaled_mean_path_matches_unit_variance_kalman_filter():
+    # With one source the state means do not depend on sigma^2 in the scaled model.
+    rng = np.random.default_rng(9)
+    spec, _x, _sigma2, w = simulate_model(rng, t_hist=6, n_leads=1, n_sources=1)
+    q = spec.transition_covariances(w)
+    res = variance_learning_filter(spec.obs, spec.g, q, spec.m0, spec.c0, spec.t_max, spec.a0, spec.b0, scaled=True)
+    ref = kalman_filter(spec.obs, spec.g, q, spec.m0, spec.c0, spec.t_max)
+    np.testing.assert_allclose(res.store.m, ref.store.m, atol=1e-12)
+    s_t = res.b[:, 0] / res.a[:, 0]
+    np.testing.assert_allclose(res.store.c, s_t[:, None, None] * ref.store.c, atol=1e-12)
+    assert np.all(np.diff(res.a[:, 0]) > 0)